@@ -1,5 +1,120 @@
-from utils.data_fetchers import fetch_and_save_cr_data, fetch_and_update_player_stats, fetch_and_save_injury_report
-print('Running data fetchers lambda')
-fetch_and_save_cr_data()
-fetch_and_update_player_stats("player_stats_2025.csv", "E2025")
-fetch_and_save_injury_report()
\ No newline at end of file
+import os
+
+from utils.cr_history import compact_cr_history
+from utils.data_fetchers import (
+    fetch_and_save_cr_data,
+    fetch_and_save_defense_vs_position_data,
+    fetch_and_save_injury_report,
+    fetch_and_update_player_stats,
+)
+from utils.http_cache import get_http_cache
+from utils.http_client import http_stats
+from utils.pipeline import Stage, print_report, run_pipeline
+from utils.rate_limit import rate_limit_snapshot, set_rate_share
+from utils.retention import run_retention
+from utils.s3_cache import get_object_cache
+from utils.sharding import LambdaInvoker, LocalInvoker, coordinate_sharded_fetch, reduce_shards, run_shard
+from utils.single_flight import single_flight_snapshot
+from utils.stats_store import compact_player_stats
+
+SEASON_CODE = "E2025"
+DATA_FILE = "player_stats_2025.csv"
+
+
+def daily_stages():
+    """
+    The daily fetch as a DAG. The four fetchers are independent and run
+    concurrently; compaction waits for the stats fetch. Precompute stages that
+    need a dataset go here with that dataset's stage in deps.
+    """
+    return [
+        Stage("cr", lambda: fetch_and_save_cr_data(raise_errors=True)),
+        Stage("cr_history", compact_cr_history, deps=["cr"]),
+        Stage("player_stats", lambda: fetch_and_update_player_stats(DATA_FILE, SEASON_CODE, max_workers=8, discover=True)),
+        Stage("compact_stats", lambda: compact_player_stats(DATA_FILE, min_partitions=10, raise_errors=True), deps=["player_stats"]),
+        # Raise instead of returning an empty frame, so a failed fetch shows up as a failed stage
+        Stage("injuries", lambda: fetch_and_save_injury_report(raise_errors=True)),
+        Stage("defense_vs_position", lambda: fetch_and_save_defense_vs_position_data(raise_errors=True)),
+    ]
+
+
+def run_daily():
+    print('Running data fetchers lambda')
+    report = run_pipeline(daily_stages())
+    print_report(report)
+
+    for host, s in http_stats.snapshot().items():
+        avg_ms = 1000 * s['total_latency'] / s['requests'] if s['requests'] else 0
+        print(f"[http] {host}: {s['requests']} requests, {s['retries']} retries, "
+              f"{s['errors']} errors, {s['bytes']} bytes, avg {avg_ms:.0f} ms")
+    for host, r in rate_limit_snapshot().items():
+        print(f"[rate] {host}: {r['rate']} req/s, concurrency {r['concurrency_limit']}, "
+              f"{r['throttled']} throttled, {r['decreases']} backoffs, waited {r['wait_seconds']:.1f}s")
+    c = get_http_cache().snapshot()
+    print(f"[http-cache] {c['not_modified']} not modified, {c['unchanged']} unchanged, {c['changed']} changed")
+    o = get_object_cache().snapshot()
+    print(f"[s3-cache] {o['hits']} hits, {o['disk_hits']} disk hits, {o['misses']} misses, "
+          f"{o['revalidations']} revalidations, {o['coalesced']} coalesced, {o['evictions']} evictions, "
+          f"{o['entries']} entries, {o['bytes'] / 1e6:.1f} MB")
+    for name, f in single_flight_snapshot().items():
+        print(f"[single-flight] {name}: {f['calls']} calls, {f['loads']} loads, {f['coalesced']} coalesced")
+    return report
+
+
+def lambda_handler(event, context):
+    """
+    Entry point. event["mode"] selects what to run:
+      daily (default)  - the regular fetch of CR, new games, injuries and
+                         defense vs position, run as a pipeline
+      coordinator      - split a game-code range into shards and fan them out
+                         to worker invocations of this same function, then reduce
+      worker           - fetch one shard (start..end) and write a partial output
+      reduce           - merge a run's partial outputs into the season dataset
+      maintenance      - archive and delete dated snapshots past the retention
+                         window (event["retention_days"], default 14)
+    Set "local": true on a coordinator event to run workers in-process instead
+    of invoking Lambda (no AWS Lambda calls; storage still follows STORAGE_BACKEND).
+    event["rate_share"] (default 1) is the fraction of the per-host rate limits
+    this invocation may use; the coordinator sets it for parallel workers.
+    """
+    event = event or {}
+    mode = event.get("mode", "daily")
+    # Warm containers keep the limiters, so reset the share on every invocation
+    set_rate_share(event.get("rate_share", 1.0))
+    season_code = event.get("season_code", SEASON_CODE)
+    data_file = event.get("data_file", DATA_FILE)
+
+    if mode == "daily":
+        report = run_daily()
+        status = "ok" if all(r["status"] == "ok" for r in report) else "partial"
+        return {"mode": mode, "status": status, "stages": report}
+
+    if mode == "coordinator":
+        if event.get("local"):
+            invoker = LocalInvoker(lambda_handler)
+        else:
+            function_name = getattr(context, "function_name", None) or os.environ["AWS_LAMBDA_FUNCTION_NAME"]
+            invoker = LambdaInvoker(function_name)
+        return coordinate_sharded_fetch(
+            season_code, data_file, invoker,
+            start=event.get("start"), end=event.get("end"),
+            shard_size=event.get("shard_size", 50), max_parallel=event.get("max_parallel", 10),
+            run_id=event.get("run_id"),
+        )
+
+    if mode == "worker":
+        return run_shard(season_code, data_file, event["run_id"], event["start"], event["end"],
+                         max_workers=event.get("max_workers", 8))
+
+    if mode == "reduce":
+        return reduce_shards(season_code, data_file, event["run_id"], compact=event.get("compact", True))
+
+    if mode == "maintenance":
+        return {"mode": mode, "datasets": run_retention(retention_days=event.get("retention_days"),
+                                                        dry_run=event.get("dry_run", False))}
+
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+if __name__ == "__main__":
+    run_daily()
@@ -0,0 +1,46 @@
+"""
+Measure the cold-start import cost of the Lambda entry point.
+
+    python lambda/measure_cold_start.py [runs]
+
+Each run imports lambda_function in a fresh interpreter and reports the import
+time and whether Streamlit or boto3 were pulled in.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {here!r})
+start = time.perf_counter()
+import lambda_function
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "streamlit": "streamlit" in sys.modules,
+    "boto3": "boto3" in sys.modules,
+}}))
+"""
+
+
+def measure(runs=5):
+    code = PROBE.format(root=os.path.dirname(HERE), here=HERE)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+if __name__ == "__main__":
+    samples = measure(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
+    seconds = [s["seconds"] for s in samples]
+    print(f"import lambda_function: median {statistics.median(seconds) * 1000:.0f} ms "
+          f"(min {min(seconds) * 1000:.0f}, max {max(seconds) * 1000:.0f}) over {len(samples)} runs")
+    print(f"streamlit imported: {samples[0]['streamlit']}, boto3 imported: {samples[0]['boto3']}")
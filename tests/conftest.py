@@ -0,0 +1,47 @@
+# tests/conftest.py
+
+import pytest
+
+from utils.config import configure
+from utils.http_client import http_stats
+from utils.mock_api import MockApi
+from utils.rate_limit import HOST_LIMITS, reset_rate_limits
+from utils.storage import LocalStorage, set_storage
+
+
+@pytest.fixture
+def use_storage(tmp_path):
+    """Install a fresh LocalStorage under tmp_path/<name> as the default bucket and return it."""
+    configure(S3_CACHE_DIR=str(tmp_path / "cache"), HTTP_CACHE_DIR=str(tmp_path / "http-cache"))
+
+    def install(name="bucket", storage_class=LocalStorage):
+        storage = storage_class(tmp_path / name)
+        set_storage(storage)
+        return storage
+
+    return install
+
+
+@pytest.fixture
+def storage(use_storage):
+    return use_storage()
+
+
+@pytest.fixture
+def mock_api():
+    """Start a MockApi (no latency, unthrottled) with the given options and point the fetchers at it."""
+    started = []
+
+    def start(**options):
+        api = MockApi(**{"latency": 0.0, "jitter": 0.0, "seed": 0, **options}).start()
+        started.append(api)
+        HOST_LIMITS[api.host] = {"rate": 10_000.0, "max_rate": 10_000.0, "max_concurrency": 64}
+        configure(**api.settings())
+        reset_rate_limits()
+        http_stats.reset()
+        return api
+
+    yield start
+    for api in started:
+        api.stop()
+        HOST_LIMITS.pop(api.host, None)
@@ -0,0 +1,68 @@
+# tests/test_data_fetchers.py
+
+import pandas as pd
+import pytest
+
+from utils.data_fetchers import fetch_and_update_player_stats
+from utils.http_client import http_stats
+from utils.s3_utils import load_from_s3
+from utils.stats_store import list_partitions, save_checkpoint
+
+SEASON_CODE = "E2099"
+DATA_FILE = "player_stats_test.csv"
+
+
+def _fetch(api, use_storage, name, checkpoint=10, **kwargs):
+    """Run one fetch into its own storage; returns (summary, stored game codes, requests sent)."""
+    use_storage(name)
+    save_checkpoint(DATA_FILE, checkpoint)
+    http_stats.reset()
+    summary = fetch_and_update_player_stats(DATA_FILE, SEASON_CODE, **kwargs)
+    requests = http_stats.snapshot().get(api.host, {}).get("requests", 0)
+    return summary, sorted(list_partitions(DATA_FILE)), requests
+
+
+@pytest.mark.parametrize("missing", [
+    [12],
+    [16, 17, 18],
+    [11, 12, 13, 14],
+    [16, 17, 18, 19],  # max_failures - 1 missing right after the discovered high point (15)
+])
+def test_discovery_matches_linear_walk_across_gaps(mock_api, use_storage, missing):
+    api = mock_api(games=30, missing=missing)
+
+    # Sequential, so request counts don't depend on how far the worker pool read ahead
+    linear, linear_games, linear_requests = _fetch(api, use_storage, "linear")
+    discovered, discovered_games, discovered_requests = _fetch(api, use_storage, "discover", discover=True)
+
+    expected = [code for code in range(11, 31) if code not in missing]
+    assert linear_games == discovered_games == expected
+    assert discovered["games"] == linear["games"] == len(expected)
+    assert discovered["last_game_code"] == 30
+    # Probed games are never requested twice
+    assert discovered_requests <= linear_requests
+
+
+def test_discovery_with_nothing_new(mock_api, use_storage):
+    api = mock_api(games=30)
+    summary, games, _ = _fetch(api, use_storage, "bucket", checkpoint=30, discover=True)
+    assert summary["games"] == 0
+    assert games == []
+
+
+@pytest.mark.parametrize("missing", [[], [12], [20, 21, 22], [14, 25, 26, 27, 28]])
+def test_concurrent_fetch_matches_sequential(mock_api, use_storage, missing):
+    api = mock_api(games=30, missing=missing)
+
+    stored = {}
+    for max_workers in (1, 8):
+        summary, games, _ = _fetch(api, use_storage, f"workers-{max_workers}", max_workers=max_workers, batch_size=7)
+        frames = {code: load_from_s3(key) for code, key in list_partitions(DATA_FILE).items()}
+        stored[max_workers] = (summary, games, frames)
+
+    (sequential, sequential_games, sequential_frames), (concurrent, concurrent_games, concurrent_frames) = stored[1], stored[8]
+    assert concurrent == sequential
+    assert concurrent_games == sequential_games == [code for code in range(11, 31) if code not in missing]
+    for code in sequential_games:
+        assert not sequential_frames[code].empty
+        pd.testing.assert_frame_equal(concurrent_frames[code], sequential_frames[code])
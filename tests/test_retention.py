@@ -0,0 +1,87 @@
+# tests/test_retention.py
+
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from utils.manifest import load_manifest, snapshot_keys
+from utils.retention import list_archives, load_archived_snapshot, run_retention
+from utils.s3_utils import save_to_s3
+from utils.storage import LocalStorage, StorageError
+
+TODAY = date(2026, 9, 20)
+DAYS = [(TODAY - timedelta(days=n)).isoformat() for n in range(19, -1, -1)]  # 2026-09-01 .. 2026-09-20
+
+
+class FlakyStorage(LocalStorage):
+    """LocalStorage whose reads of fail_keys raise a (non-404) StorageError."""
+    fail_keys = set()
+
+    def get_versioned(self, key, if_none_match=None):
+        if key in self.fail_keys:
+            raise StorageError(f"read failed for {key}: simulated")
+        return super().get_versioned(key, if_none_match=if_none_match)
+
+
+def _seed():
+    for i, day in enumerate(DAYS):
+        save_to_s3(f"player_cr_data_{day}.csv",
+                   pd.DataFrame({"PlayerName": ["A Player", "B Player"], "CR": [10.0 + i, 8.0], "position": "G"}))
+        save_to_s3(f"defense_vs_position_{day}.csv",
+                   pd.DataFrame({"Team": ["AAA"], "Position": ["Guards"], "Points": [float(i)]}))
+
+
+@pytest.fixture
+def seeded(storage):
+    _seed()
+    return storage
+
+
+def test_run_retention_archives_and_deletes_expired_snapshots(seeded):
+    results = run_retention(retention_days=14, today=TODAY)
+
+    expired = [day for day in DAYS if day < "2026-09-06"]
+    kept = [day for day in DAYS if day >= "2026-09-06"]
+    manifest = load_manifest()
+    for dataset, summary in zip(["player_cr_data", "defense_vs_position"], results):
+        assert summary["expired"] == len(expired)
+        assert summary["deleted"] == len(expired)
+        assert list_archives(dataset) == [f"archive/{dataset}/{dataset}_2026-09.parquet"]
+        assert list(snapshot_keys(dataset)) == kept
+
+        entry = manifest["datasets"][dataset]
+        assert entry["key"] == f"{dataset}_{DAYS[-1]}.parquet"
+        assert entry["archived_through"] == expired[-1]
+        assert entry["retention_days"] == 14
+
+    archived = load_archived_snapshot("player_cr_data", expired[0])
+    assert archived["CR"].tolist() == [10.0, 8.0]
+    # The dailies were folded into the CR history before they were deleted
+    assert manifest["datasets"]["player_cr_history"]["compacted_through"] == DAYS[-1]
+
+
+def test_run_retention_dry_run_changes_nothing(seeded):
+    results = run_retention(retention_days=14, today=TODAY, dry_run=True)
+
+    assert [summary["expired"] for summary in results] == [5, 5]
+    assert list(snapshot_keys("player_cr_data")) == DAYS
+    assert list_archives("player_cr_data") == []
+    assert load_manifest()["datasets"] == {}
+
+
+def test_run_retention_keeps_days_it_could_not_read(use_storage):
+    storage = use_storage(storage_class=FlakyStorage)
+    _seed()
+    unreadable = "defense_vs_position_2026-09-03.parquet"
+    storage.fail_keys = {unreadable}
+
+    _, defense = run_retention(retention_days=14, today=TODAY)
+
+    assert defense["deleted"] == 4
+    assert storage.exists(unreadable)
+    assert "2026-09-03" in snapshot_keys("defense_vs_position")
+    storage.fail_keys = set()
+    assert load_archived_snapshot("defense_vs_position", "2026-09-03").empty
+    assert load_archived_snapshot("defense_vs_position", "2026-09-04")["Points"].tolist() == [3.0]
+    assert load_manifest()["datasets"]["defense_vs_position"]["archived_through"] == "2026-09-05"
@@ -0,0 +1,56 @@
+# tests/test_sharding.py
+
+from utils.sharding import LocalInvoker, coordinate_sharded_fetch, reduce_shards, run_shard, shard_prefix
+from utils.stats_store import list_partitions, load_player_stats
+
+SEASON_CODE = "E2099"
+DATA_FILE = "player_stats_test.csv"
+RUN_ID = "test-run"
+
+
+class FlakyWorkers:
+    """Lambda handler stand-in that records worker results and fails shards starting at fail_starts."""
+
+    def __init__(self, fail_starts=()):
+        self.fail_starts = set(fail_starts)
+        self.results = []
+
+    def __call__(self, event, context):
+        if event["mode"] == "worker":
+            if event["start"] in self.fail_starts:
+                raise RuntimeError(f"worker for shard {event['start']}-{event['end']} died: simulated")
+            result = run_shard(SEASON_CODE, DATA_FILE, event["run_id"], event["start"], event["end"], max_workers=2)
+            self.results.append(result)
+            return result
+        return reduce_shards(SEASON_CODE, DATA_FILE, event["run_id"])
+
+
+def _coordinate(handler):
+    return coordinate_sharded_fetch(SEASON_CODE, DATA_FILE, LocalInvoker(handler), start=11, end=30,
+                                    shard_size=5, max_parallel=4, run_id=RUN_ID)
+
+
+def test_failed_shard_skips_reduce_and_rerun_redoes_only_it(mock_api, storage):
+    mock_api(games=30, missing=[17])
+
+    first = FlakyWorkers(fail_starts=[21])
+    result = _coordinate(first)
+
+    assert result["reduce"] is None
+    assert [(f["start"], f["end"]) for f in result["failed"]] == [(21, 25)]
+    assert sorted(r["start"] for r in first.results) == [11, 16, 26]
+    # Nothing reached the season dataset; the completed shard outputs are kept for the retry
+    assert list_partitions(DATA_FILE) == {}
+    assert load_player_stats(DATA_FILE).empty
+    assert len(storage.list(shard_prefix(DATA_FILE, RUN_ID))) == 3
+
+    retry = FlakyWorkers()
+    result = _coordinate(retry)
+
+    assert result["failed"] == []
+    assert sorted(r["start"] for r in retry.results if not r["skipped"]) == [21]
+    assert sorted(r["start"] for r in retry.results if r["skipped"]) == [11, 16, 26]
+    assert result["reduce"]["games"] == 19
+    stored = sorted(load_player_stats(DATA_FILE)["GameCode"].unique())
+    assert stored == [code for code in range(11, 31) if code != 17]
+    assert storage.list(shard_prefix(DATA_FILE, RUN_ID)) == []
@@ -0,0 +1,62 @@
+# tests/test_stats_store.py
+
+import pandas as pd
+import pytest
+
+from utils.stats_store import compact_player_stats, list_partitions, upsert_rows, write_game_partitions
+from utils.storage import LocalStorage, StorageError
+
+DATA_FILE = "player_stats_test.csv"
+
+
+class ReadOnlyStorage(LocalStorage):
+    """LocalStorage whose writes of fail_keys raise a StorageError."""
+    fail_keys = set()
+
+    def put(self, key, body, if_match=None, if_none_match=None):
+        if key in self.fail_keys:
+            raise StorageError(f"write failed for {key}: simulated")
+        return super().put(key, body, if_match=if_match, if_none_match=if_none_match)
+
+
+def test_upsert_fills_columns_base_does_not_have():
+    base = pd.DataFrame({"GameCode": [3, 3], "PlayerID": ["a", "b"], "PIR": [5, 6]})
+    updates = pd.DataFrame({"GameCode": [3], "PlayerID": ["a"], "PIR": [5], "Points": [2]})
+
+    result, counts = upsert_rows(base, updates)
+
+    assert counts == {"inserted": 0, "updated": 1, "unchanged": 0}
+    assert result["Points"].tolist()[0] == 2
+    assert result["Points"].isna().tolist() == [False, True]
+
+
+def test_upsert_missing_value_in_new_column_is_unchanged():
+    base = pd.DataFrame({"GameCode": [3], "PlayerID": ["a"], "PIR": [5]})
+    updates = pd.DataFrame({"GameCode": [3], "PlayerID": ["a"], "PIR": [5], "Points": [None]})
+
+    result, counts = upsert_rows(base, updates)
+
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 1}
+    assert result is base
+
+
+def test_upsert_counts_with_duplicate_keys_in_base():
+    base = pd.DataFrame({"GameCode": [1, 3, 3], "PlayerID": ["x", "a", "a"], "PIR": [1, 4, 5]})
+    updates = pd.DataFrame({"GameCode": [1, 3, 4], "PlayerID": ["x", "a", "z"], "PIR": [1, 6, 7]})
+
+    result, counts = upsert_rows(base, updates)
+
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+    assert result[["GameCode", "PlayerID", "PIR"]].values.tolist() == [[1, "x", 1], [3, "a", 6], [4, "z", 7]]
+
+
+def test_compact_raises_on_failed_save_in_pipeline_mode(use_storage):
+    storage = use_storage(storage_class=ReadOnlyStorage)
+    write_game_partitions(DATA_FILE, pd.DataFrame({"GameCode": [1, 2], "PlayerID": ["a", "a"], "PIR": [3, 4]}))
+    storage.fail_keys = {"player_stats_test.parquet"}
+
+    assert compact_player_stats(DATA_FILE) is None
+    with pytest.raises(RuntimeError):
+        compact_player_stats(DATA_FILE, raise_errors=True)
+    # Nothing was folded, so the partitions are still there
+    assert sorted(list_partitions(DATA_FILE)) == [1, 2]
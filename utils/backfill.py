@@ -0,0 +1,99 @@
+# utils/backfill.py
+"""
+Historical backfill of player stats for several seasons at once.
+
+    python -m utils.backfill E2023 E2024 E2025 --processes 3 --workers 8
+
+Each season runs in its own worker process with bounded request concurrency
+and writes its own dataset. The processes split the per-host rate limits
+(utils.rate_limit.HOST_LIMITS) evenly, so together they never exceed what a
+single process may send. Progress is committed through the per-season fetch
+checkpoint, so re-running the same command resumes where each season stopped.
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .data_fetchers import fetch_and_update_player_stats
+from .rate_limit import set_rate_share
+from .stats_store import compact_player_stats, load_checkpoint
+
+
+def season_data_file(season_code):
+    """E2024 -> player_stats_2024.csv"""
+    return f"player_stats_{season_code.lstrip('E')}.csv"
+
+
+def backfill_season(season_code, max_workers=8, batch_size=20):
+    """
+    Fetch everything not yet stored for one season, then compact it.
+    Runs inside a worker process; returns a summary with timing.
+    """
+    data_file = season_data_file(season_code)
+    resumed_from = load_checkpoint(data_file)
+    start = time.perf_counter()
+    summary = fetch_and_update_player_stats(
+        data_file, season_code, max_workers=max_workers, discover=True, batch_size=batch_size
+    )
+    if summary["games"]:
+        compact_player_stats(data_file)
+    elapsed = time.perf_counter() - start
+    return {
+        "season": season_code,
+        "resumed_from": resumed_from,
+        **summary,
+        "seconds": elapsed,
+        "games_per_sec": summary["games"] / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def backfill_seasons(season_codes, processes=None, max_workers=8, batch_size=20):
+    """
+    Backfill season_codes in parallel worker processes and print progress and
+    throughput as each season finishes. Returns the per-season summaries.
+    """
+    processes = min(processes or len(season_codes), len(season_codes))
+    start = time.perf_counter()
+    results = []
+    # Each process gets an equal share of the per-host request budget
+    with ProcessPoolExecutor(max_workers=processes, initializer=set_rate_share,
+                             initargs=(1.0 / processes,)) as executor:
+        futures = {
+            executor.submit(backfill_season, season, max_workers, batch_size): season
+            for season in season_codes
+        }
+        for future in as_completed(futures):
+            season = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"[backfill] {season} failed: {e} (re-run to resume from its checkpoint)")
+                continue
+            results.append(result)
+            print(
+                f"[backfill] {season} done ({len(results)}/{len(season_codes)}): "
+                f"{result['games']} games through gameCode={result['last_game_code']} "
+                f"(resumed after {result['resumed_from']}) in {result['seconds']:.1f}s, "
+                f"{result['games_per_sec']:.2f} games/sec"
+            )
+
+    elapsed = time.perf_counter() - start
+    total_games = sum(r["games"] for r in results)
+    rate = total_games / elapsed if elapsed > 0 else 0.0
+    print(f"[backfill] {total_games} games across {len(results)} seasons in {elapsed:.1f}s ({rate:.2f} games/sec)")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill player stats for several seasons.")
+    parser.add_argument("seasons", nargs="+", help="Season codes, e.g. E2023 E2024")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: one per season)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent requests per season")
+    parser.add_argument("--batch-size", type=int, default=20, help="Games per committed batch")
+    args = parser.parse_args(argv)
+    backfill_seasons(args.seasons, args.processes, args.workers, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# utils/benchmark.py
+"""
+Throughput benchmark for the fetchers against the local mock API (utils.mock_api).
+
+    python -m utils.benchmark --games 200 --latency 0.05 --jitter 0.05 --error-rate 0.02 --missing 17,80
+    python -m utils.benchmark fixtures/ --modes concurrent,discover --unthrottled
+
+Every mode runs against fresh local storage and reports games/sec, request
+count, retries, errors, p50/p95 request latency and total wall time. The mock
+host gets the Euroleague rate limits by default, so the numbers reflect what
+the limiter allows in production; --unthrottled lifts them to measure the
+fetch code alone.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from .config import configure
+from .mock_api import MockApi, parse_game_codes
+from .rate_limit import HOST_LIMITS, reset_rate_limits
+
+SEASON_CODE = "E2099"
+DATA_FILE = "player_stats_bench.csv"
+
+
+def _stats_modes():
+    """Player-stats fetch modes: name -> callable returning the number of games fetched."""
+    from .data_fetchers import fetch_and_update_player_stats
+    from .sharding import LocalInvoker, coordinate_sharded_fetch, reduce_shards, run_shard
+
+    def sharded():
+        def handler(event, context):
+            if event["mode"] == "worker":
+                return run_shard(SEASON_CODE, DATA_FILE, event["run_id"], event["start"], event["end"])
+            return reduce_shards(SEASON_CODE, DATA_FILE, event["run_id"])
+        result = coordinate_sharded_fetch(SEASON_CODE, DATA_FILE, LocalInvoker(handler),
+                                          shard_size=50, max_parallel=4)
+        return (result["reduce"] or {}).get("games", 0)
+
+    return {
+        "sequential": lambda: fetch_and_update_player_stats(DATA_FILE, SEASON_CODE)["games"],
+        "concurrent": lambda: fetch_and_update_player_stats(DATA_FILE, SEASON_CODE, max_workers=8)["games"],
+        "discover": lambda: fetch_and_update_player_stats(DATA_FILE, SEASON_CODE, max_workers=8,
+                                                          discover=True)["games"],
+        "sharded": sharded,
+    }
+
+
+def _other_modes():
+    """The single-shot fetchers; they report rows instead of games."""
+    from .data_fetchers import (
+        fetch_and_save_cr_data,
+        fetch_and_save_defense_vs_position_data,
+        fetch_and_save_injury_report,
+    )
+    return {
+        "cr": fetch_and_save_cr_data,
+        "injuries": fetch_and_save_injury_report,
+        "defense": fetch_and_save_defense_vs_position_data,
+    }
+
+
+def _latency_summary(host):
+    from .http_client import http_stats
+    s = http_stats.snapshot().get(host)
+    if not s:
+        return {"requests": 0, "retries": 0, "errors": 0, "p50_ms": None, "p95_ms": None}
+    latencies = pd.Series(s["latencies"]) * 1000
+    return {
+        "requests": s["requests"],
+        "retries": s["retries"],
+        "errors": s["errors"],
+        "p50_ms": round(latencies.quantile(0.5), 1),
+        "p95_ms": round(latencies.quantile(0.95), 1),
+    }
+
+
+def run_benchmark(api, modes, workdir):
+    """
+    Run each mode against api with its own empty LocalStorage under workdir.
+    Returns one result row per mode.
+    """
+    from .http_client import http_stats
+    from .storage import LocalStorage, set_storage
+
+    stats_modes, other_modes = _stats_modes(), _other_modes()
+    results = []
+    for mode in modes:
+        func = stats_modes.get(mode) or other_modes.get(mode)
+        if func is None:
+            raise ValueError(f"Unknown mode {mode}; choose from {sorted({**stats_modes, **other_modes})}")
+        set_storage(LocalStorage(os.path.join(workdir, mode)))
+        http_stats.reset()
+        reset_rate_limits()
+
+        start = time.perf_counter()
+        try:
+            out, error = func(), None
+        except Exception as e:
+            out, error = None, f"{type(e).__name__}: {e}"
+        wall = time.perf_counter() - start
+
+        games = out if mode in stats_modes and out is not None else None
+        rows = len(out) if isinstance(out, pd.DataFrame) else None
+        results.append({
+            "mode": mode,
+            "games": games,
+            "rows": rows,
+            "wall_s": round(wall, 3),
+            "games_per_sec": round(games / wall, 2) if games else None,
+            **_latency_summary(api.host),
+            "error": error,
+        })
+    return results
+
+
+def print_results(results):
+    print(f"{'mode':<12} {'games':>6} {'rows':>6} {'wall s':>8} {'games/s':>8} {'reqs':>6} "
+          f"{'retry':>6} {'err':>5} {'p50 ms':>8} {'p95 ms':>8}  error")
+    for r in results:
+        cells = ["" if r[k] is None else r[k] for k in
+                 ("games", "rows", "wall_s", "games_per_sec", "requests", "retries", "errors", "p50_ms", "p95_ms")]
+        print(f"{r['mode']:<12} {cells[0]:>6} {cells[1]:>6} {cells[2]:>8} {cells[3]:>8} {cells[4]:>6} "
+              f"{cells[5]:>6} {cells[6]:>5} {cells[7]:>8} {cells[8]:>8}  {r['error'] or ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fetchers against the local mock API.")
+    parser.add_argument("fixture_dir", nargs="?", help="Recorded fixtures (default: synthetic payloads)")
+    parser.add_argument("--modes", default="sequential,concurrent,discover,sharded,cr,injuries,defense")
+    parser.add_argument("--games", type=int, default=200, help="Games in the mock season")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Extra uniform random latency, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--missing", default="", help="Game codes missing inside the season, e.g. 17,40-42")
+    parser.add_argument("--unthrottled", action="store_true", help="Lift the client-side rate limits")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    api = MockApi(args.fixture_dir, games=args.games, latency=args.latency, jitter=args.jitter,
+                  error_rate=args.error_rate, missing=parse_game_codes(args.missing), seed=0)
+    limits = HOST_LIMITS["live.euroleague.net"]
+    if args.unthrottled:
+        limits = {"rate": 10_000.0, "max_rate": 10_000.0, "max_concurrency": 64}
+    HOST_LIMITS[api.host] = limits
+
+    with api, tempfile.TemporaryDirectory() as workdir:
+        configure(**api.settings(), S3_CACHE_DIR=os.path.join(workdir, "cache"),
+                  HTTP_CACHE_DIR=os.path.join(workdir, "http-cache"))
+        results = run_benchmark(api, [m.strip() for m in args.modes.split(",") if m.strip()], workdir)
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
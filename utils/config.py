@@ -0,0 +1,63 @@
+# utils/config.py
+
+import os
+import sys
+import threading
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# Where Streamlit looks for secrets; read directly so headless code never imports Streamlit
+SECRETS_FILES = [
+    os.path.join(os.getcwd(), ".streamlit", "secrets.toml"),
+    os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml"),
+]
+
+_overrides = {}
+_file_secrets = None
+_lock = threading.Lock()
+
+
+def configure(**settings):
+    """Inject settings explicitly (e.g. from CLI args or a test); these win over everything else."""
+    with _lock:
+        _overrides.update(settings)
+
+
+def _load_secrets_files():
+    global _file_secrets
+    if _file_secrets is None:
+        secrets = {}
+        if tomllib is not None:
+            for path in reversed(SECRETS_FILES):
+                try:
+                    with open(path, "rb") as f:
+                        secrets.update(tomllib.load(f))
+                except (OSError, ValueError):
+                    continue
+        _file_secrets = secrets
+    return _file_secrets
+
+
+def get_setting(name, default=None):
+    """
+    Look a setting up in order: configure() overrides, environment variables,
+    .streamlit/secrets.toml, and finally st.secrets, but only if the Streamlit
+    app already imported streamlit (this module never imports it itself).
+    """
+    if name in _overrides:
+        return _overrides[name]
+    if name in os.environ:
+        return os.environ[name]
+    secrets = _load_secrets_files()
+    if name in secrets:
+        return secrets[name]
+    st = sys.modules.get("streamlit")
+    if st is not None:
+        try:
+            return st.secrets[name]
+        except Exception:
+            pass
+    return default
@@ -0,0 +1,140 @@
+# utils/cr_history.py
+"""
+CR price history, compacted from the daily player_cr_data_YYYY-MM-DD snapshots.
+
+The history is one delta-encoded table of (PlayerName, Date, CR): a row is
+stored only on a player's first snapshot and on days their CR changed, so a
+season of dailies shrinks to a few rows per player. Rows are kept sorted by
+(PlayerName, Date), which makes a player's trend a binary search and
+"CR as of date X" a single pass.
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from .manifest import dataset_name, list_snapshots, load_manifest, resolve_key, update_dataset_entry
+from .s3_utils import load_from_s3, save_to_s3
+
+SNAPSHOT_PREFIX = "player_cr_data"
+HISTORY_FILE = "player_cr_history.csv"
+HISTORY_COLUMNS = ["PlayerName", "Date", "CR"]
+
+
+def _empty_history():
+    return pd.DataFrame({col: pd.Series(dtype="float64" if col == "CR" else object) for col in HISTORY_COLUMNS})
+
+
+def _sorted(history):
+    return history.sort_values(["PlayerName", "Date"], kind="stable").reset_index(drop=True)
+
+
+def latest_prices(history):
+    """Each player's most recent CR in history, as a Series indexed by PlayerName."""
+    if history.empty:
+        return pd.Series(dtype="float64")
+    last = history.drop_duplicates(subset="PlayerName", keep="last")
+    return pd.Series(last["CR"].to_numpy(), index=last["PlayerName"].to_numpy())
+
+
+def delta_rows(last_prices, snapshot, day):
+    """
+    Rows for one snapshot: players whose CR differs from last_prices (or who
+    are new). Returns (rows, updated last_prices).
+    """
+    snap = snapshot[["PlayerName", "CR"]].dropna().drop_duplicates(subset="PlayerName")
+    previous = last_prices.reindex(snap["PlayerName"]).to_numpy()
+    current = snap["CR"].to_numpy(dtype="float64")
+    changed = np.isnan(previous) | ~np.isclose(previous, current)
+    rows = pd.DataFrame({"PlayerName": snap["PlayerName"].to_numpy()[changed], "Date": day, "CR": current[changed]})
+    if len(rows):
+        last_prices = pd.concat([last_prices.drop(rows["PlayerName"], errors="ignore"),
+                                 pd.Series(rows["CR"].to_numpy(), index=rows["PlayerName"].to_numpy())])
+    return rows, last_prices
+
+
+def load_cr_history(manifest=None):
+    """Load the compacted history via the manifest; an empty history if none was built yet."""
+    if manifest is None:
+        manifest = load_manifest()
+    key = resolve_key(manifest, dataset_name(HISTORY_FILE)) or HISTORY_FILE
+    history = load_from_s3(key)
+    if history is None or history.empty:
+        return _empty_history()
+    return _sorted(history[HISTORY_COLUMNS])
+
+
+def compact_cr_history(prefix=SNAPSHOT_PREFIX):
+    """
+    Fold every snapshot newer than the history's compacted_through date into
+    the history, save and publish it. Incremental: each daily snapshot is read
+    once, ever. Returns the history DataFrame (None if nothing new).
+    """
+    manifest = load_manifest()
+    entry = manifest.get("datasets", {}).get(dataset_name(HISTORY_FILE), {})
+    compacted_through = entry.get("compacted_through")
+    snapshots = list_snapshots(prefix, after=compacted_through)
+    if not snapshots:
+        print(f"CR history is up to date (through {compacted_through}).")
+        return None
+
+    history = load_cr_history(manifest)
+    last_prices = latest_prices(history)
+    new_rows = []
+    for day, key in snapshots.items():
+        snapshot = load_from_s3(key)
+        if snapshot is None or snapshot.empty:
+            continue
+        rows, last_prices = delta_rows(last_prices, snapshot, day)
+        new_rows.append(rows)
+
+    if new_rows:
+        history = _sorted(pd.concat([history, *new_rows], ignore_index=True))
+    last_day = max(snapshots)
+    key = save_to_s3(HISTORY_FILE, history)
+    if key is None:
+        return None
+    update_dataset_entry(
+        dataset_name(HISTORY_FILE),
+        key=key,
+        rows=int(len(history)),
+        players=int(history["PlayerName"].nunique()),
+        compacted_through=last_day,
+    )
+    added = sum(len(r) for r in new_rows)
+    print(f"CR history: folded {len(snapshots)} snapshots through {last_day}, {added} changes, {len(history)} rows.")
+    return history
+
+
+def cr_trend(history, player_name):
+    """
+    A player's CR change points as a DataFrame (Date, CR), oldest first.
+    history must be sorted by (PlayerName, Date), as load_cr_history returns it.
+    """
+    names = history["PlayerName"].to_numpy()
+    lo = np.searchsorted(names, player_name, side="left")
+    hi = np.searchsorted(names, player_name, side="right")
+    return history.iloc[lo:hi][["Date", "CR"]].reset_index(drop=True)
+
+
+def cr_as_of(history, day):
+    """Every player's CR on `day` (the last change on or before it), indexed by PlayerName."""
+    day = day.isoformat() if isinstance(day, date) else day
+    return latest_prices(history[history["Date"] <= day])
+
+
+def cr_movers(history, since, until=None, n=10):
+    """
+    Price risers and fallers between `since` and `until` (default: latest).
+    Players without a price on `since` are left out.
+    Returns (risers, fallers): DataFrames of PlayerName, CR_Then, CR_Now, Change.
+    """
+    then = cr_as_of(history, since)
+    now = cr_as_of(history, until) if until else latest_prices(history)
+    changes = pd.DataFrame({"CR_Then": then, "CR_Now": now.reindex(then.index)}).dropna()
+    changes["Change"] = changes["CR_Now"] - changes["CR_Then"]
+    changes = changes[changes["Change"] != 0].rename_axis("PlayerName").reset_index()
+    risers = changes.nlargest(n, "Change").reset_index(drop=True)
+    fallers = changes.nsmallest(n, "Change").reset_index(drop=True)
+    return risers, fallers
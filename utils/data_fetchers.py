@@ -1,16 +1,43 @@
 # utils/data_fetchers.py
 
+import contextvars
 import requests
+import numpy as np
 import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from .s3_utils import load_from_s3, save_to_s3
-
-def fetch_and_save_cr_data():
-    """
-    Fetch CR data from the dunkest API and save it to S3.
-    """
+from itertools import islice
+from .config import get_setting
+from .http_cache import cached_get
+from .http_client import http_get
+from .manifest import publish_dataset
+from .s3_utils import save_to_s3
+from .stats_store import last_stored_game_code, save_checkpoint, write_game_partitions
+
+# Defaults for the API base URL settings; overridable so the fetchers can run
+# against a local mock API (see utils.mock_api)
+DEFAULT_URLS = {
+    "BOXSCORE_URL": "https://live.euroleague.net/api/Boxscore",
+    "CR_URL": "https://www.dunkest.com/api/stats/table",
+    "INJURY_URL": "https://www.rotowire.com/euro/tables/injury-report.php",
+    "DEFENSE_URL": "https://www.dunkest.com/api/stats/defense-vs-position",
+}
+
+
+def api_base_url(name):
+    """Current value of one of the DEFAULT_URLS settings (read on every call, so configure() always applies)."""
+    return get_setting(name, DEFAULT_URLS[name])
+
+DEFENSE_POSITIONS = {
+    1: 'Guard',
+    2: 'Forward',
+    3: 'Center'
+}
+
+def cr_api_url():
+    """The full CR table URL: every week and round of the season."""
     # Construct URL parameters dynamically
-    base_url = "https://www.dunkest.com/api/stats/table"
     params = [
         "season_id=23",
         "mode=dunkest",
@@ -31,9 +58,25 @@ def fetch_and_save_cr_data():
     for r in range(1, 81):
         params.append(f"rounds%5B%5D={r}")
 
-    api_url = f"{base_url}?{'&'.join(params)}"
+    return f"{api_base_url('CR_URL')}?{'&'.join(params)}"
+
+def boxscore_api_url(game_code, season_code):
+    return f"{api_base_url('BOXSCORE_URL')}?gamecode={game_code}&seasoncode={season_code}"
+
+def injury_api_url():
+    return f"{api_base_url('INJURY_URL')}?team=ALL&pos=ALL"
+
+def defense_api_url(pos_id):
+    return f"{api_base_url('DEFENSE_URL')}?season_id=23&stats_id=25&position_id={pos_id}"
 
-    response = requests.get(api_url)
+def fetch_and_save_cr_data(raise_errors=False):
+    """
+    Fetch CR data from the dunkest API and save it to S3.
+    The request goes through the conditional HTTP cache; when the payload is
+    identical to the last one saved, nothing is written. A failed save is only
+    printed, unless raise_errors is set (pipeline stages).
+    """
+    response = cached_get(cr_api_url(), timeout=30)
     cr_data = response.json()
 
     cr_df = pd.DataFrame(cr_data)
@@ -45,110 +88,344 @@ def fetch_and_save_cr_data():
     today = datetime.today().strftime("%Y-%m-%d")
     filename = f"player_cr_data_{today}.csv"
 
-    save_to_s3(filename, cr_df)
-    print(f"Player CR and Position data saved to {filename}")
+    if response.unchanged:
+        print("CR data unchanged since the last saved snapshot; skipping save.")
+        return cr_df
+
+    key = save_to_s3(filename, cr_df)
+    if key:
+        publish_dataset(key, cr_df)
+        response.mark_saved()
+        print(f"Player CR and Position data saved to {key}")
+    elif raise_errors:
+        raise RuntimeError(f"Failed to save the CR data to {filename}")
     return cr_df
 
-def fetch_and_update_player_stats(data_file, season_code):
+# Per-player stats captured from the Boxscore JSON: column -> JSON field
+BOXSCORE_STATS = {
+    "PIR": "Valuation",
+    "Points": "Points",
+    "Rebounds": "TotalRebounds",
+    "OffensiveRebounds": "OffensiveRebounds",
+    "DefensiveRebounds": "DefensiveRebounds",
+    "Assists": "Assistances",
+    "Steals": "Steals",
+    "Blocks": "BlocksFavour",
+    "BlocksAgainst": "BlocksAgainst",
+    "Turnovers": "Turnovers",
+    "FoulsCommitted": "FoulsCommited",
+    "FoulsReceived": "FoulsReceived",
+    "FieldGoalsMade2": "FieldGoalsMade2",
+    "FieldGoalsAttempted2": "FieldGoalsAttempted2",
+    "FieldGoalsMade3": "FieldGoalsMade3",
+    "FieldGoalsAttempted3": "FieldGoalsAttempted3",
+    "FreeThrowsMade": "FreeThrowsMade",
+    "FreeThrowsAttempted": "FreeThrowsAttempted",
+}
+BOXSCORE_COLUMNS = ["Season", "GameCode", "Team", "PlayerID", "PlayerName", *BOXSCORE_STATS, "Seconds"]
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _float_column(players, field):
+    values = [p.get(field) for p in players]
+    try:
+        # Numbers, numeric strings and None (-> NaN) convert in one pass
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.fromiter(map(_to_float, values), dtype=np.float64, count=len(values))
+
+def _to_seconds(value):
+    """'23:45' -> 1425; DNP, empty or missing minutes count as 0 seconds played."""
+    if not value or not isinstance(value, str) or ":" not in value:
+        return 0
+    minutes, _, seconds = value.partition(":")
+    try:
+        return int(minutes) * 60 + int(seconds)
+    except ValueError:
+        return 0
+
+def parse_boxscore(data, game_code, season_code):
     """
-    Fetch new game data from the Euroleague API and update the player stats file in S3
-    with deduplication at the player+game level.
+    Turn a Boxscore JSON payload into typed column arrays ({column: ndarray}),
+    one array per BOXSCORE_COLUMNS entry, filled column by column straight from
+    the player objects (no intermediate row dicts). Returns None without 'Stats'.
     """
-    # Load existing data from S3
-    df = load_from_s3(data_file)
-    if not df.empty:
-        print(f"Loaded existing data with {len(df)} rows.")
-    else:
-        print("No existing data found.")
+    if 'Stats' not in data:
+        return None
+    teams = data['Stats']
+    players = [player for team_stat in teams for player in team_stat['PlayersStats']]
+    n = len(players)
+
+    columns = {
+        'Season': np.full(n, season_code, dtype=object),
+        'GameCode': np.full(n, game_code, dtype=np.int32),
+        'Team': np.repeat(np.array([t['Team'] for t in teams], dtype=object),
+                          [len(t['PlayersStats']) for t in teams]),
+        'PlayerID': np.array([(p.get('Player_ID') or '').strip() for p in players], dtype=object),
+        'PlayerName': np.array([(p.get('Player') or '').strip() for p in players], dtype=object),
+    }
+    for column, field in BOXSCORE_STATS.items():
+        columns[column] = _float_column(players, field)
+    columns['Seconds'] = np.fromiter((_to_seconds(p.get('Minutes')) for p in players), dtype=np.int32, count=n)
+    return columns
+
+def boxscore_frame(games):
+    """Concatenate parsed games (see parse_boxscore) into one DataFrame with BOXSCORE_COLUMNS."""
+    if not games:
+        return pd.DataFrame({col: pd.Series(dtype=object) for col in BOXSCORE_COLUMNS})
+    return pd.DataFrame({col: np.concatenate([g[col] for g in games]) for col in BOXSCORE_COLUMNS})
+
+def _fetch_boxscore(game_code, season_code):
+    """
+    Fetch a single game's boxscore from the Euroleague API.
+    Returns its parsed column arrays, or None if the game is missing or the request failed.
+    """
+    print(f"Fetching game; gameCode={game_code}")
+    api_endpoint = boxscore_api_url(game_code, season_code)
 
-    last_stored_game_code = df['GameCode'].max() if not df.empty else 0
+    try:
+        response = http_get(api_endpoint, timeout=10, max_retries=2)
+        response.raise_for_status()  # Raises error if status code is not 200
+
+        columns = parse_boxscore(response.json(), game_code, season_code)
+        if columns is None:
+            # If 'Stats' is missing, treat it as a failure
+            print(f"No stats found for gameCode={game_code}.")
+        return columns
+
+    except requests.exceptions.ReadTimeout:
+        print(f"Timeout for gameCode={game_code}.")
+    except (ValueError, requests.exceptions.RequestException) as e:
+        print(f"Error for gameCode={game_code}: {e}")
+    except Exception as e:
+        print(f"Unexpected error for gameCode={game_code}: {e}")
+    return None
 
-    # Define game codes to fetch, starting from the last stored one
-    new_game_codes = range(last_stored_game_code + 1, last_stored_game_code + 1000)
-    all_player_data = []
-    consecutive_failures = 0  # Counter for consecutive failures
-    max_failures = 5          # Stop fetching after 5 consecutive failures
+def _iter_boxscores(game_codes, season_code, max_workers=1):
+    """
+    Yield (game_code, columns) in game-code order.
+    With max_workers > 1, up to max_workers games are fetched ahead in a thread pool;
+    results are still yielded strictly in order, and anything still pending is
+    cancelled once the caller stops iterating.
+    """
+    if max_workers <= 1:
+        for game_code in game_codes:
+            yield game_code, _fetch_boxscore(game_code, season_code)
+        return
 
-    for game_code in new_game_codes:
-        print(f"Fetching game; gameCode={game_code}")
-        api_endpoint = f"https://live.euroleague.net/api/Boxscore?gamecode={game_code}&seasoncode={season_code}"
+    codes = iter(game_codes)
+    in_flight = deque()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
 
-        try:
-            response = requests.get(api_endpoint, timeout=10)
-            response.raise_for_status()  # Raises error if status code is not 200
+    def submit(code):
+        # Run in a copy of the caller's context so per-stage counters still apply
+        ctx = contextvars.copy_context()
+        in_flight.append((code, executor.submit(ctx.run, _fetch_boxscore, code, season_code)))
 
-            data = response.json()
+    try:
+        for game_code in islice(codes, max_workers):
+            submit(game_code)
+
+        while in_flight:
+            game_code, future = in_flight.popleft()
+            columns = future.result()
+            # Keep the window full before handing the result back
+            for next_code in islice(codes, 1):
+                submit(next_code)
+            yield game_code, columns
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def fetch_game_range(season_code, start, end, max_workers=1):
+    """
+    Fetch every game in [start, end] and return their rows as one DataFrame.
+    Missing games are skipped; no stop rule applies (used by shard workers).
+    """
+    games = [columns for _, columns in _iter_boxscores(range(start, end + 1), season_code, max_workers=max_workers)
+             if columns is not None]
+    return boxscore_frame(games)
+
+def _iter_linear(season_code, last_game_code, max_workers=1, max_failures=5, known=None):
+    """
+    Yield (game_code, columns) upward from last_game_code, in order, until
+    max_failures consecutive games are missing. known maps game codes that
+    were already fetched to their columns (None if missing); those aren't
+    requested again.
+    """
+    known = dict(known or {})
+    # Define game codes to fetch, starting from the last stored one
+    new_game_codes = range(last_game_code + 1, last_game_code + 1000)
+    consecutive_failures = 0  # Counter for consecutive failures
 
-            if 'Stats' not in data:
-                # If 'Stats' is missing, treat it as a failure
-                print(f"No stats found for gameCode={game_code}.")
+    # known is consumed below while to_fetch is still lazily running; filter against a fixed copy
+    skip = frozenset(known)
+    to_fetch = (code for code in new_game_codes if code not in skip)
+    boxscores = _iter_boxscores(to_fetch, season_code, max_workers=max_workers)
+    try:
+        for game_code in new_game_codes:
+            columns = known.pop(game_code) if game_code in known else next(boxscores)[1]
+            if columns is None:
                 consecutive_failures += 1
             else:
                 # Reset failure counter on success
-                consecutive_failures = 0  
-
-                # Process data into a flat structure
-                for team_stat in data['Stats']:
-                    for player in team_stat['PlayersStats']:
-                        player_info = {
-                            'Season': season_code,
-                            'GameCode': game_code,
-                            'Team': team_stat['Team'],
-                            'PlayerID': player.get('Player_ID', '').strip(),
-                            'PlayerName': player.get('Player', '').strip(),
-                            'PIR': player.get('Valuation', None)
-                        }
-                        all_player_data.append(player_info)
-
-        except requests.exceptions.ReadTimeout:
-            print(f"Timeout for gameCode={game_code}.")
-            consecutive_failures += 1
-        except (ValueError, requests.exceptions.RequestException) as e:
-            print(f"Error for gameCode={game_code}: {e}")
-            consecutive_failures += 1
-        except Exception as e:
-            print(f"Unexpected error for gameCode={game_code}: {e}")
-            consecutive_failures += 1
-
-        # Stop fetching if consecutive failures reach the limit
-        if consecutive_failures >= max_failures:
-            print(f"Reached {max_failures} consecutive failures. Stopping fetch.")
-            break
+                consecutive_failures = 0
+            yield game_code, columns
 
-    # Create a new DataFrame for fetched data
-    if all_player_data:
-        new_df = pd.DataFrame(all_player_data)
+            # Stop fetching if consecutive failures reach the limit
+            if consecutive_failures >= max_failures:
+                print(f"Reached {max_failures} consecutive failures. Stopping fetch.")
+                break
+    finally:
+        boxscores.close()
 
-        # Combine existing data with new data
-        if not df.empty:
-            combined_df = pd.concat([df, new_df], ignore_index=True)
+def discover_last_game_code(season_code, last_game_code, max_probe=1024):
+    """
+    Find the highest available game code after last_game_code with an exponential
+    probe (last+1, last+2, last+4, ...) followed by a binary search between the
+    last hit and the first miss: about 2*log2(new games) requests.
+
+    Assumes games are published in game-code order; a probe that lands on a
+    missing game in the middle of the range (e.g. a postponed one) ends the
+    search early, so the result is only a lower bound and _iter_discovered
+    keeps walking past it.
+    Returns (highest_available, probed), where probed maps each probed game code
+    to its parsed columns (None if missing) so those games aren't fetched twice.
+    """
+    probed = {}
+
+    def available(code):
+        if code not in probed:
+            probed[code] = _fetch_boxscore(code, season_code)
+        return probed[code] is not None
+
+    lo, hi = last_game_code, None
+    step = 1
+    while step <= max_probe:
+        code = last_game_code + step
+        if not available(code):
+            hi = code
+            break
+        lo = code
+        step *= 2
+    if hi is None:
+        print(f"All probes up to gameCode={lo} succeeded; capping discovery there.")
+        return lo, probed
+
+    # Invariant: lo is available (or the stored high-water mark), hi is missing
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if available(mid):
+            lo = mid
         else:
-            combined_df = new_df
+            hi = mid
 
-        # Deduplicate by GameCode + PlayerID
-        deduplicated_df = combined_df.drop_duplicates(subset=['GameCode', 'PlayerID'], keep='last')
+    print(f"Discovered games up to gameCode={lo} with {len(probed)} probes.")
+    return lo, probed
 
-        # Save deduplicated data back to S3
-        save_to_s3(data_file, deduplicated_df)
-        print(f"Updated stats file saved with {len(deduplicated_df)} unique rows.")
-        return deduplicated_df
+def _iter_discovered(season_code, last_game_code, max_workers=1, max_failures=5):
+    """
+    Discover the available range, then yield (game_code, columns) for every game
+    in it, in order, fetching only the games that weren't already probed.
+    Past the discovered range the linear walk takes over with the same
+    max_failures stop rule, so a single missing game doesn't strand the games
+    published after it.
+    """
+    highest, probed = discover_last_game_code(season_code, last_game_code)
+    remaining = [code for code in range(last_game_code + 1, highest + 1) if code not in probed]
+    boxscores = _iter_boxscores(remaining, season_code, max_workers=max_workers)
+    try:
+        for code in range(last_game_code + 1, highest + 1):
+            columns = probed.pop(code) if code in probed else next(boxscores)[1]
+            if columns is None:
+                print(f"Skipping missing gameCode={code} inside the discovered range.")
+            yield code, columns
+    finally:
+        boxscores.close()
+
+    yield from _iter_linear(season_code, highest, max_workers, max_failures, known=probed)
+
+def fetch_and_update_player_stats(data_file, season_code, max_workers=1, max_failures=5, discover=False,
+                                  batch_size=20):
+    """
+    Fetch new game data from the Euroleague API and append it to the season's
+    player stats as one partition object per game (see utils.stats_store).
+    Nothing already stored is downloaded or rewritten; compact_player_stats folds
+    the partitions back into data_file.
+
+    Completed games are flushed every batch_size games and a checkpoint (last
+    committed game code) is saved after each flush, so memory stays bounded and
+    a run that dies mid-backfill resumes from the checkpoint, refetching at
+    most one batch.
+    Returns a summary dict: games, rows, last_game_code.
+
+    max_workers > 1 fetches boxscores concurrently; games are still consumed in
+    game-code order, so the stop rule (max_failures consecutive missing games)
+    and the saved rows are identical to the sequential run.
+
+    discover=True finds the bulk of a backlog with discover_last_game_code (about
+    2*log2(new games) requests) before the linear walk checks past it.
+    """
+    # The high-water mark comes from the manifest/checkpoint, so the season file isn't downloaded
+    last_game_code = last_stored_game_code(data_file)
+    print(f"Last stored game code: {last_game_code}")
 
-    # If no new data was fetched, return the existing df
-    return df
+    if discover:
+        boxscores = _iter_discovered(season_code, last_game_code, max_workers, max_failures)
+    else:
+        boxscores = _iter_linear(season_code, last_game_code, max_workers, max_failures)
+
+    summary = {"games": 0, "rows": 0, "last_game_code": last_game_code}
+    batch = []
+
+    def flush():
+        # Write only the new games, one partition per GameCode, then checkpoint
+        new_df = boxscore_frame(batch)
+        written = write_game_partitions(data_file, new_df)
+        if len(written) < len(batch):
+            raise RuntimeError(f"Only {len(written)} of {len(batch)} partitions were written; stopping.")
+        committed = int(new_df["GameCode"].max())
+        save_checkpoint(data_file, committed)
+        summary["games"] += len(batch)
+        summary["rows"] += len(new_df)
+        summary["last_game_code"] = committed
+        print(f"Committed {len(batch)} games through gameCode={committed}.")
 
-def fetch_and_save_injury_report():
+    try:
+        for game_code, columns in boxscores:
+            if columns is None:
+                continue
+            batch.append(columns)
+            if len(batch) >= batch_size:
+                flush()
+                batch = []
+        if batch:
+            flush()
+    finally:
+        boxscores.close()
+
+    if not summary["games"]:
+        print("No new games found.")
+    else:
+        print(f"Saved {summary['games']} new game partitions with {summary['rows']} rows.")
+    return summary
+
+def fetch_and_save_injury_report(raise_errors=False):
     """
     Fetch EuroLeague injury report from Rotowire and save it to S3 as injury_report_YYYY-MM-DD.csv.
-    Returns the cleaned DataFrame.
+    Returns the cleaned DataFrame. Fetch and save errors are printed and an
+    empty DataFrame returned, unless raise_errors is set (pipeline stages).
     """
-    api_url = "https://www.rotowire.com/euro/tables/injury-report.php?team=ALL&pos=ALL"
-
     try:
-        response = requests.get(api_url, timeout=10)
-        response.raise_for_status()
+        response = cached_get(injury_api_url(), timeout=10)
         injuries = response.json()
     except Exception as e:
         print(f"[injury] fetch error: {e}")
+        if raise_errors:
+            raise
         return pd.DataFrame()
 
     injuries_df = pd.DataFrame(injuries)
@@ -164,32 +441,37 @@ def fetch_and_save_injury_report():
 
     filename = f"injury_report.csv"
 
-    save_to_s3(filename, injuries_df)
-    print(f"Injury report saved to {filename}")
+    if response.unchanged:
+        print("Injury report unchanged since the last save; skipping save.")
+        return injuries_df
+
+    key = save_to_s3(filename, injuries_df)
+    if key:
+        publish_dataset(key, injuries_df)
+        response.mark_saved()
+        print(f"Injury report saved to {key}")
+    elif raise_errors:
+        raise RuntimeError(f"Failed to save the injury report to {filename}")
     return injuries_df
 
-def fetch_and_save_defense_vs_position_data():
+def fetch_and_save_defense_vs_position_data(raise_errors=False):
     """
     Fetch 'defense vs position' data from Dunkest API for Guards, Forwards, and Centers,
-    combine them, and save to S3.
+    combine them, and save to S3. Positions that fail to load are printed and
+    left out, unless raise_errors is set (pipeline stages): then any failure
+    raises and nothing incomplete is saved.
     """
-    positions = {
-        1: 'Guard',
-        2: 'Forward',
-        3: 'Center'
-    }
-    
     all_data = []
+    responses = []
+    errors = []
 
-    for pos_id, pos_name in positions.items():
-        # URL provided by user
-        url = f"https://www.dunkest.com/api/stats/defense-vs-position?season_id=23&stats_id=25&position_id={pos_id}"
+    for pos_id, pos_name in DEFENSE_POSITIONS.items():
         print(f"Fetching defense data for {pos_name} (ID: {pos_id})...")
         
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
+            response = cached_get(defense_api_url(pos_id), timeout=10)
             data = response.json()
+            responses.append(response)
             
             # The API returns a list of objects. We add them to our master list.
             # We'll attach the position name/id to each row if it's not already there clearly.
@@ -201,7 +483,10 @@ def fetch_and_save_defense_vs_position_data():
                 
         except Exception as e:
             print(f"Error fetching data for {pos_name}: {e}")
+            errors.append(f"{pos_name}: {e}")
 
+    if errors and raise_errors:
+        raise RuntimeError(f"Defense vs position fetch failed for {'; '.join(errors)}")
     if not all_data:
         print("No defense vs position data fetched.")
         return pd.DataFrame()
@@ -212,7 +497,17 @@ def fetch_and_save_defense_vs_position_data():
     today = datetime.today().strftime("%Y-%m-%d")
     filename = f"defense_vs_position_{today}.csv"
 
-    save_to_s3(filename, df)
-    print(f"Defense vs Position data saved to {filename} with {len(df)} rows.")
+    if len(responses) == len(DEFENSE_POSITIONS) and all(r.unchanged for r in responses):
+        print("Defense vs position data unchanged since the last save; skipping save.")
+        return df
+
+    key = save_to_s3(filename, df)
+    if key:
+        publish_dataset(key, df)
+        for response in responses:
+            response.mark_saved()
+        print(f"Defense vs Position data saved to {key} with {len(df)} rows.")
+    elif raise_errors:
+        raise RuntimeError(f"Failed to save defense vs position data to {filename}")
     return df
 
@@ -1,9 +1,11 @@
 # utils/data_processing.py
 
+import threading
 import pandas as pd
 import numpy as np
-import streamlit as st
+from cachetools import TTLCache, cached
 from .s3_utils import load_from_s3
+from .manifest import load_manifest, resolve_key
 from datetime import datetime, timedelta
 
 
@@ -40,22 +42,32 @@ def load_and_merge_data(
     cr_prefix: str = "player_cr_data",
     max_lookback_days: int = 14,
     include_injuries: bool = True,
-    injuries_key: str = "injury_report.csv",
 ):
     """
-    Loads player stats and merges:
-      1) most recent CR file: player_cr_data_YYYY-MM-DD.csv (walk back day-by-day)
-      2) optional injury report (injury_report.csv) on PlayerName
+    Loads player stats merged with the most recent CR file and (optionally)
+    the injury report on PlayerName.
 
     Returns a row-level dataframe with columns like:
       PlayerName, position, CR, PIR, ... , InjuryStatus, Injury
+
+    This is the merged frame of the shared page bundle (utils.page_data), so
+    it is loaded once per data version and concurrent callers share that load;
+    each caller gets its own copy.
     """
-    player_stats_df = load_from_s3(player_stats_file)
+    from .page_data import get_page_data  # page_data builds on this module
+
+    merged_df = get_page_data(player_stats_file, cr_prefix, max_lookback_days).merged
+    if not include_injuries:
+        return merged_df.drop(columns=["InjuryStatus", "Injury"], errors="ignore")
+    return merged_df.copy()
 
-    # Find & load the most recent CR file
-    cr_df, cr_key = _load_latest_cr_df(prefix=cr_prefix, max_lookback_days=max_lookback_days)
-    print(f"Cr data loaded from file {cr_key}")
 
+def merge_player_data(player_stats_df, cr_df, inj_df=None):
+    """
+    Merge already-loaded player stats with CR data and, when inj_df is given
+    (even empty), the injury report. Returns the row-level dataframe described
+    in load_and_merge_data.
+    """
     # Align names: "Last, First" -> "First Last"
     def format_name(name: str):
         parts = name.split(", ")
@@ -63,6 +75,9 @@ def load_and_merge_data(
 
     player_stats_df = player_stats_df.copy()
     player_stats_df["PlayerName"] = player_stats_df["PlayerName"].apply(format_name)
+    # Playing time is stored as numeric seconds; the views show minutes
+    if "Seconds" in player_stats_df.columns:
+        player_stats_df["Minutes"] = (player_stats_df["Seconds"] / 60).round(1)
 
     # Merge CR
     merged_df = pd.merge(player_stats_df, cr_df, on="PlayerName", how="left")
@@ -71,13 +86,8 @@ def load_and_merge_data(
         merged_df["position"] = merged_df["position"].astype(str)
 
     # Merge Injuries (optional)
-    if include_injuries:
-        try:
-            inj_df = load_injuries_df(injuries_key)  # assumes you added this helper earlier
-        except Exception:
-            inj_df = pd.DataFrame()
-
-        if inj_df is not None and not inj_df.empty:
+    if inj_df is not None:
+        if not inj_df.empty:
             # Keep only the minimal columns and de-duplicate by player
             cols = [c for c in ["Player", "InjuryStatus", "Injury"] if c in inj_df.columns]
             inj_min = inj_df[cols].drop_duplicates(subset=["Player"]) if "Player" in cols else pd.DataFrame()
@@ -98,12 +108,21 @@ def load_and_merge_data(
     return merged_df
 
 
-def _load_latest_cr_df(prefix: str = "player_cr_data_", max_lookback_days: int = 14):
+def _load_latest_cr_df(prefix: str = "player_cr_data", max_lookback_days: int = 14, manifest=None):
     """
-    Try to load the most recent CR CSV by walking back from today, up to max_lookback_days.
+    Load the CR snapshot the manifest points to. Without a manifest entry, fall back
+    to walking back from today, up to max_lookback_days.
     Returns (cr_df, key) on success.
     Raises FileNotFoundError if none found.
     """
+    if manifest is None:
+        manifest = load_manifest()
+    key = resolve_key(manifest, prefix)
+    if key:
+        cr_df = load_from_s3(key)
+        if cr_df is not None and not cr_df.empty:
+            return cr_df, key
+
     today = datetime.today().date()
     last_error = None
 
@@ -226,6 +245,66 @@ def calculate_pir_stats(df, last_x_games):
 
     return last_games_stats
 
+PIR_WINDOWS = range(1, 21)
+
+
+def build_pir_windows(df, windows=PIR_WINDOWS):
+    """
+    Per-player Average_PIR / StdDev_PIR over the last N games for every N in
+    windows, plus all games (key None), in the same shape calculate_pir_stats
+    returns. One sort by (PlayerName, GameCode desc) and cumulative sums of
+    PIR and PIR^2 give every window at once; CR, position and injury columns
+    come from each player's most recent game.
+    Returns {N or None: DataFrame}; empty if there is no PIR data.
+    """
+    if "PIR" not in df.columns:
+        print("PIR data is not available. Some features may be limited.")
+        return {}
+    carried = [c for c in ["CR", "position", "InjuryStatus", "Injury"] if c in df.columns]
+    ordered = (df[df["PlayerName"].notna()]
+               .sort_values(["PlayerName", "GameCode"], ascending=[True, False], kind="stable"))
+    if ordered.empty:
+        return {}
+
+    players = ordered["PlayerName"].to_numpy()
+    pir = ordered["PIR"].to_numpy(dtype="float64")
+    valid = ~np.isnan(pir)
+    pir = np.where(valid, pir, 0.0)
+    # Prefix sums with a leading 0: the sum over rows [a, b) is c[b] - c[a]
+    sums = np.concatenate([[0.0], np.cumsum(pir)])
+    squares = np.concatenate([[0.0], np.cumsum(pir * pir)])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+
+    starts = np.flatnonzero(np.r_[True, players[1:] != players[:-1]])
+    games = np.diff(np.r_[starts, len(players)])
+    latest = ordered.iloc[starts]
+    base = pd.DataFrame({"PlayerName": players[starts]})
+
+    def window_stats(n_rows, zero_std=False):
+        ends = starts + n_rows
+        n = (counts[ends] - counts[starts]).astype("float64")
+        total = sums[ends] - sums[starts]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, total / n, np.nan)
+            var = np.where(n > 1, (squares[ends] - squares[starts] - total * mean) / (n - 1), np.nan)
+        stats = base.assign(Average_PIR=mean,
+                            StdDev_PIR=0.0 if zero_std else np.sqrt(np.clip(var, 0.0, None)))
+        for col in carried:
+            stats[col] = latest[col].to_numpy()
+        return stats
+
+    table = {n: window_stats(np.minimum(games, n), zero_std=n == 1) for n in windows}
+    table[None] = window_stats(games)
+    return table
+
+
+def select_pir_window(pir_windows, last_x_games, min_cr, max_cr, position):
+    """Look up one window of build_pir_windows (None = all games) and apply the CR/position filter."""
+    stats = pir_windows.get(last_x_games)
+    if stats is None:
+        return pd.DataFrame()
+    return filter_by_cr_and_position(stats, min_cr, max_cr, position).reset_index(drop=True)
+
 def get_dominant_players(df):
     """
     Filter out players that are 'dominated' by others in terms of PIR.
@@ -248,16 +327,20 @@ def get_dominant_players(df):
     return pd.DataFrame(dominant_players)
 
 # --- Injuries helpers --- #
-@st.cache_data(ttl=10 * 60)  # cache for 10 minutes
+@cached(TTLCache(maxsize=8, ttl=10 * 60), lock=threading.Lock())  # cache for 10 minutes
 def load_injuries_df(key: str = "injury_report.csv") -> pd.DataFrame:
     """
     Load injuries CSV from S3 and normalize column names:
     expects columns like: player, team, position, injury, status (others are ignored).
     """
+    return read_injuries_df(key)
+
+def read_injuries_df(key: str = "injury_report.csv") -> pd.DataFrame:
+    """load_injuries_df without the TTL cache, for callers that track data versions themselves."""
     try:
         df = load_from_s3(key)
     except Exception as e:
-        st.warning(f"Could not load injuries: {e}")
+        print(f"Could not load injuries: {e}")
         return pd.DataFrame()
 
     if df is None or df.empty:
@@ -327,12 +410,22 @@ def add_injury_badge(df: pd.DataFrame) -> pd.DataFrame:
 
     return out
 
-def load_defense_vs_position_df(max_lookback_days: int = 14) -> pd.DataFrame:
+def load_defense_vs_position_df(max_lookback_days: int = 14, manifest=None) -> pd.DataFrame:
     """
-    Load the most recent defense vs position CSV by walking back from today.
+    Load the defense vs position snapshot the manifest points to, falling back to
+    walking back from today when the manifest has no entry.
     Returns empty DataFrame if not found.
     """
     prefix = "defense_vs_position"
+    if manifest is None:
+        manifest = load_manifest()
+    key = resolve_key(manifest, prefix)
+    if key:
+        df = load_from_s3(key)
+        if df is not None and not df.empty:
+            print(f"Defense data loaded from file {key}")
+            return df
+
     today = datetime.today().date()
     
     for d in range(max_lookback_days + 1):
@@ -0,0 +1,158 @@
+# utils/http_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .config import get_setting
+from .http_client import http_get
+
+
+def canonical_url(url):
+    """Cache identity of a URL: lowercase scheme/host, query params sorted, no fragment."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ""))
+
+
+class CachedResponse:
+    """
+    A response body served through HttpCache.
+    not_modified: the server answered 304, the body came from disk.
+    unchanged: the payload is byte-identical to the last one marked as saved,
+    so whatever was derived from it doesn't need to be written again.
+    """
+
+    def __init__(self, cache, key, content, status_code, meta):
+        self._cache = cache
+        self._key = key
+        self.content = content
+        self.status_code = status_code
+        self.not_modified = status_code == 304
+        self.content_hash = meta["content_hash"]
+        self.unchanged = meta.get("saved_hash") == self.content_hash
+
+    def json(self):
+        return json.loads(self.content)
+
+    def mark_saved(self):
+        """Record that this payload has been persisted downstream."""
+        self._cache.mark_saved(self._key, self.content_hash)
+
+
+class HttpCache:
+    """
+    On-disk cache of GET responses keyed by canonical URL. Each entry keeps the
+    body plus its ETag, Last-Modified and a SHA-256 of the body; requests are
+    sent with If-None-Match / If-Modified-Since, and when the server ignores
+    them the content hash still tells whether the payload changed.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self.stats = {"not_modified": 0, "unchanged": 0, "changed": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, digest)
+        return f"{base}.body", f"{base}.json"
+
+    def _read(self, key):
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        if hashlib.sha256(body).hexdigest() != meta.get("content_hash"):
+            return None, None  # torn or corrupted entry
+        return body, meta
+
+    def _write_atomic(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _write(self, key, body, meta):
+        body_path, meta_path = self._paths(key)
+        self._write_atomic(body_path, body)
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get(self, url, **kwargs):
+        """
+        Conditional GET through http_get. Raises for error statuses like
+        raise_for_status would; returns a CachedResponse.
+        """
+        key = canonical_url(url)
+        body, meta = self._read(key)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = http_get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and body is not None:
+            self._count("not_modified")
+            return CachedResponse(self, key, body, 304, meta)
+        response.raise_for_status()
+
+        content = response.content
+        content_hash = hashlib.sha256(content).hexdigest()
+        previous = meta or {}
+        self._count("unchanged" if previous.get("content_hash") == content_hash else "changed")
+        meta = {
+            "url": key,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": content_hash,
+            "saved_hash": previous.get("saved_hash"),
+            "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        self._write(key, content, meta)
+        return CachedResponse(self, key, content, response.status_code, meta)
+
+    def mark_saved(self, key, content_hash):
+        with self._lock:
+            body, meta = self._read(key)
+            if meta is not None and meta["content_hash"] == content_hash:
+                meta["saved_hash"] = content_hash
+                self._write(key, body, meta)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """Process-wide HttpCache; HTTP_CACHE_DIR sets its directory."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                cache_dir = get_setting("HTTP_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "fantassistant-http-cache")
+                _cache = HttpCache(cache_dir)
+    return _cache
+
+
+def cached_get(url, **kwargs):
+    """GET url through the process-wide on-disk HTTP cache (see HttpCache.get)."""
+    return get_http_cache().get(url, **kwargs)
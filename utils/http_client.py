@@ -0,0 +1,164 @@
+# utils/http_client.py
+
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .rate_limit import get_host_limiter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Responses that mean "slow down": they shrink the host's rate and concurrency limits
+THROTTLE_STATUSES = {429, 503}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_maxsize=16):
+    """
+    Return the process-wide requests.Session shared by all fetchers.
+    Connections are kept alive and pooled per host, so repeated calls to the
+    same API reuse the TCP/TLS connection instead of handshaking every time.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_maxsize)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+class HttpStats:
+    """Thread-safe per-host counters: requests, retries, errors, bytes and latency."""
+
+    def __init__(self, max_samples=1000):
+        self._lock = threading.Lock()
+        self._max_samples = max_samples
+        self._hosts = {}
+
+    def _host(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = {
+                "requests": 0,
+                "retries": 0,
+                "errors": 0,
+                "bytes": 0,
+                "total_latency": 0.0,
+                "latencies": deque(maxlen=self._max_samples),
+            }
+        return self._hosts[host]
+
+    def record(self, host, latency, nbytes=0, error=False):
+        with self._lock:
+            h = self._host(host)
+            h["requests"] += 1
+            h["bytes"] += nbytes
+            h["total_latency"] += latency
+            h["latencies"].append(latency)
+            if error:
+                h["errors"] += 1
+
+    def record_retry(self, host):
+        with self._lock:
+            self._host(host)["retries"] += 1
+
+    def snapshot(self):
+        """Return a plain-dict copy of the counters, keyed by host."""
+        with self._lock:
+            return {
+                host: {**h, "latencies": list(h["latencies"])}
+                for host, h in self._hosts.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._hosts.clear()
+
+
+http_stats = HttpStats()
+
+# Optional per-caller byte counter (e.g. one per pipeline stage); propagated to
+# worker threads that run inside a copied context
+_byte_counter = contextvars.ContextVar("http_byte_counter", default=None)
+_byte_counter_lock = threading.Lock()
+
+
+@contextmanager
+def track_bytes():
+    """Count response bytes downloaded by http_get within this context."""
+    counter = {"bytes": 0, "requests": 0}
+    token = _byte_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _byte_counter.reset(token)
+
+
+def _count_bytes(nbytes):
+    counter = _byte_counter.get()
+    if counter is not None:
+        with _byte_counter_lock:
+            counter["bytes"] += nbytes
+            counter["requests"] += 1
+
+
+def _backoff_delay(attempt, base, cap):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _retry_after(response, cap=30.0):
+    """Seconds requested by a Retry-After header (delta-seconds form only), capped."""
+    try:
+        return min(cap, float(response.headers.get("Retry-After", 0)))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def http_get(url, params=None, timeout=10, max_retries=3, backoff_base=0.5, backoff_max=8.0, **kwargs):
+    """
+    GET through the shared session with jittered exponential backoff.
+    Retries on 429/5xx responses, timeouts and connection errors. After the last
+    attempt an error response is returned as-is (callers still call raise_for_status)
+    and a network error is re-raised.
+
+    Every attempt goes through the host's rate limiter (see utils.rate_limit):
+    429/503 responses and timeouts make it back off, successes let it ramp up.
+    """
+    host = urlsplit(url).netloc
+    session = get_session()
+    limiter = get_host_limiter(host)
+
+    for attempt in range(max_retries + 1):
+        delay = _backoff_delay(attempt, backoff_base, backoff_max)
+        with limiter.slot() as outcome:
+            start = time.perf_counter()
+            try:
+                response = session.get(url, params=params, timeout=timeout, **kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                outcome["throttled"] = True
+                http_stats.record(host, time.perf_counter() - start, error=True)
+                if attempt == max_retries:
+                    raise
+            else:
+                retryable = response.status_code in RETRY_STATUSES
+                outcome["throttled"] = response.status_code in THROTTLE_STATUSES
+                http_stats.record(host, time.perf_counter() - start, len(response.content), error=retryable)
+                _count_bytes(len(response.content))
+                if not retryable or attempt == max_retries:
+                    return response
+                delay = max(delay, _retry_after(response))
+
+        http_stats.record_retry(host)
+        time.sleep(delay)
@@ -0,0 +1,140 @@
+# utils/manifest.py
+
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+from .schemas import SCHEMA_VERSION
+from .storage import ObjectNotFound, PreconditionFailed, StorageError, get_storage
+
+MANIFEST_KEY = "manifest.json"
+
+_DATED_SUFFIX = re.compile(r"_\d{4}-\d{2}-\d{2}$")
+_SNAPSHOT_KEY = re.compile(r"^(\d{4}-\d{2}-\d{2})\.(?:csv|parquet)$")
+_publish_lock = threading.Lock()
+_MAX_PUBLISH_ATTEMPTS = 10
+
+
+def dataset_name(filename):
+    """
+    Logical dataset name for a storage key:
+      player_cr_data_2025-01-31.parquet -> player_cr_data
+      player_stats_2025.csv             -> player_stats_2025
+    """
+    stem = filename.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    return _DATED_SUFFIX.sub("", stem)
+
+
+def snapshot_keys(prefix, bucket_name=None):
+    """
+    Stored daily snapshots of a dated dataset (<prefix>_YYYY-MM-DD.<ext> at the
+    bucket root): {date string: [keys]}, oldest date first. When a day exists
+    in several formats the Parquet object is listed first.
+    """
+    days = {}
+    for key in get_storage(bucket_name).list(f"{prefix}_"):
+        if "/" in key:
+            continue
+        match = _SNAPSHOT_KEY.match(key[len(prefix) + 1:])
+        if match:
+            days.setdefault(match.group(1), []).append(key)
+    return {day: sorted(keys, key=lambda k: not k.endswith(".parquet")) for day, keys in sorted(days.items())}
+
+
+def list_snapshots(prefix, after=None, bucket_name=None):
+    """{date string: key} for a dated dataset's snapshots, optionally only those dated after `after`."""
+    return {day: keys[0] for day, keys in snapshot_keys(prefix, bucket_name).items() if not after or day > after}
+
+
+def load_manifest(bucket_name=None):
+    """
+    Read the manifest. Returns an empty manifest when none has been published yet
+    (callers then fall back to their old lookup).
+    """
+    try:
+        body = get_storage(bucket_name).get(MANIFEST_KEY)
+        return json.loads(body)
+    except (StorageError, ValueError) as e:
+        print(f"No dataset manifest available: {e}")
+        return {"version": 0, "datasets": {}}
+
+
+def resolve_key(manifest, dataset):
+    """Return the current key for dataset from an already-loaded manifest, or None."""
+    entry = manifest.get("datasets", {}).get(dataset)
+    return entry.get("key") if entry else None
+
+
+def update_dataset_entry(dataset, bucket_name=None, updater=None, **fields):
+    """
+    Merge fields into the manifest entry for dataset (stamping schema version,
+    write time and a per-dataset revision counter) and bump the manifest
+    version. Returns the new manifest.
+
+    The write is conditional on the manifest not having changed since it was
+    read, and retried on conflict, so publishers in other processes or Lambda
+    invocations never overwrite each other's entries. Fields derived from the
+    entry itself (counters, high-water marks) must come from updater: it is
+    called with a copy of the freshly read entry on every attempt and returns
+    more fields to merge, so a retry never writes values computed from a stale
+    read.
+    """
+    storage = get_storage(bucket_name)
+    # Serializes concurrent publishers within this process (pipeline stages run in parallel)
+    with _publish_lock:
+        for attempt in range(_MAX_PUBLISH_ATTEMPTS):
+            try:
+                body, etag = storage.get_versioned(MANIFEST_KEY)
+                manifest = json.loads(body)
+            except ObjectNotFound:
+                manifest, etag = {"version": 0, "datasets": {}}, None
+            except (StorageError, ValueError) as e:
+                print(f"Failed to read manifest for {dataset}: {e}")
+                return load_manifest(bucket_name)
+
+            now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            entry = manifest.setdefault("datasets", {}).setdefault(dataset, {})
+            derived = updater(dict(entry)) if updater is not None else {}
+            entry.update(fields, **derived, schema_version=SCHEMA_VERSION, written_at=now,
+                         revision=entry.get("revision", 0) + 1)
+            manifest["version"] = manifest.get("version", 0) + 1
+            manifest["updated_at"] = now
+            body = json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8")
+            try:
+                if etag:
+                    storage.put(MANIFEST_KEY, body, if_match=etag)
+                else:
+                    storage.put(MANIFEST_KEY, body, if_none_match="*")
+            except PreconditionFailed:
+                time.sleep(random.uniform(0.05, 0.2) * (attempt + 1))
+                continue
+            except StorageError as e:
+                print(f"Failed to publish manifest for {dataset}: {e}")
+                return manifest
+            print(f"Manifest v{manifest['version']}: {dataset} -> {entry.get('key')}")
+            return manifest
+
+    print(f"Gave up publishing manifest for {dataset} after {_MAX_PUBLISH_ATTEMPTS} conflicting writes.")
+    return load_manifest(bucket_name)
+
+
+def publish_dataset(key, df, bucket_name=None, **extra):
+    """
+    Point the manifest's entry for key's dataset at key, recording row count,
+    max GameCode (if present), schema version and write time.
+
+    Call this only after the data object itself has been written, so a reader
+    that sees the new manifest can always load what it points to. All datasets
+    share the one manifest object, so a single read gives a consistent view.
+    """
+    return update_dataset_entry(
+        dataset_name(key),
+        bucket_name=bucket_name,
+        key=key,
+        rows=int(len(df)),
+        max_game_code=int(df["GameCode"].max()) if "GameCode" in df.columns and not df.empty else None,
+        **extra,
+    )
@@ -0,0 +1,345 @@
+# utils/mock_api.py
+"""
+Record/replay stand-in for the external APIs the fetchers call (Euroleague
+Boxscore, Dunkest CR table and defense vs position, Rotowire injuries).
+
+    python -m utils.mock_api record fixtures/ --season E2024 --games 1-30
+    python -m utils.mock_api serve fixtures/ --games 300 --latency 0.05 --error-rate 0.02 --missing 17,42
+
+Fixture layout (one captured JSON response per file):
+
+    boxscore/<season>_<gamecode>.json
+    cr.json
+    injuries.json
+    defense_<position_id>.json
+
+Games 1..games are served, recorded boxscores are recycled for game codes that
+were not recorded, and synthetic payloads fill in when nothing was recorded.
+Point the fetchers at the server with configure(**mock.settings())
+(BOXSCORE_URL, CR_URL, INJURY_URL, DEFENSE_URL).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ROUTES = {
+    "BOXSCORE_URL": "/api/Boxscore",
+    "CR_URL": "/api/stats/table",
+    "INJURY_URL": "/euro/tables/injury-report.php",
+    "DEFENSE_URL": "/api/stats/defense-vs-position",
+}
+
+TEAMS = ["BAR", "RMB", "OLY", "PAN", "MCO", "FBB", "ULK", "MIL", "ZAL", "VIR", "BAS", "PAR"]
+
+
+def _player_line(rng, team, i):
+    fg2m, fg2a = rng.randint(0, 8), rng.randint(8, 14)
+    fg3m, fg3a = rng.randint(0, 4), rng.randint(4, 8)
+    ftm, fta = rng.randint(0, 6), rng.randint(6, 8)
+    points = 2 * fg2m + 3 * fg3m + ftm
+    rebounds = rng.randint(0, 10)
+    assists, steals, blocks, turnovers = rng.randint(0, 8), rng.randint(0, 3), rng.randint(0, 2), rng.randint(0, 4)
+    missed = (fg2a - fg2m) + (fg3a - fg3m) + (fta - ftm)
+    return {
+        "Player_ID": f"P{team}{i:02d}  ",
+        "Player": f"PLAYER{i:02d}, {team}",
+        "Minutes": f"{rng.randint(5, 35):02d}:{rng.randint(0, 59):02d}",
+        "Points": points,
+        "FieldGoalsMade2": fg2m, "FieldGoalsAttempted2": fg2a,
+        "FieldGoalsMade3": fg3m, "FieldGoalsAttempted3": fg3a,
+        "FreeThrowsMade": ftm, "FreeThrowsAttempted": fta,
+        "OffensiveRebounds": rebounds // 3, "DefensiveRebounds": rebounds - rebounds // 3,
+        "TotalRebounds": rebounds,
+        "Assistances": assists, "Steals": steals, "Turnovers": turnovers,
+        "BlocksFavour": blocks, "BlocksAgainst": rng.randint(0, 2),
+        "FoulsCommited": rng.randint(0, 5), "FoulsReceived": rng.randint(0, 5),
+        "Valuation": points + rebounds + assists + steals + blocks - turnovers - missed,
+    }
+
+
+def synthetic_boxscore(game_code, players_per_team=12):
+    """A Boxscore-shaped payload with deterministic random stat lines for game_code."""
+    rng = random.Random(game_code)
+    home = TEAMS[game_code % len(TEAMS)]
+    away = TEAMS[(game_code + 1) % len(TEAMS)]
+    return {"Stats": [
+        {"Team": team, "PlayersStats": [_player_line(rng, team, i) for i in range(players_per_team)]}
+        for team in (home, away)
+    ]}
+
+
+def synthetic_cr(n_players=240):
+    rng = random.Random(0)
+    return [
+        {"first_name": f"First{i}", "last_name": f"Last{i}", "cr": round(rng.uniform(4, 35), 1),
+         "position": rng.choice("GFC")}
+        for i in range(n_players)
+    ]
+
+
+def synthetic_injuries(n_players=20):
+    rng = random.Random(1)
+    return [
+        {"ID": i, "Player": f"First{i} Last{i}", "Team": rng.choice(TEAMS), "Pos": rng.choice("GFC"),
+         "Injury": "Knee", "Status": rng.choice(["Out", "Questionable"]), "playerURL": "", "rDate": ""}
+        for i in range(n_players)
+    ]
+
+
+def synthetic_defense(pos_id):
+    rng = random.Random(100 + pos_id)
+    return [{"team_code": team, "pdk": round(rng.uniform(8, 16), 2)} for team in TEAMS]
+
+
+class MockApi:
+    """
+    Local HTTP server replaying fixtures with configurable behaviour:
+    latency (+ uniform jitter) per request, error_rate (fraction of requests
+    answered with error_status), the number of games in the season, and game
+    codes that are missing inside it. With etags, 200 responses carry an ETag
+    and a matching If-None-Match gets a 304. Use as a context manager, or
+    start()/stop().
+    """
+
+    def __init__(self, fixture_dir=None, games=None, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_status=503, missing=(), etags=True, host="127.0.0.1", port=0, seed=None):
+        self.fixture_dir = fixture_dir
+        self.etags = etags
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.missing = set(missing)
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.requests = 0
+
+        self._boxscores = self._load_boxscores()
+        recorded = [code for _, code in self._boxscores]
+        self.games = games if games is not None else (max(recorded) if recorded else 100)
+        self._recycled = sorted(self._boxscores)
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    def _fixture_path(self, *parts):
+        return os.path.join(self.fixture_dir, *parts) if self.fixture_dir else None
+
+    def _read_fixture(self, *parts):
+        path = self._fixture_path(*parts)
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+        return None
+
+    def _load_boxscores(self):
+        """(season, game_code) -> path for every recorded boxscore."""
+        directory = self._fixture_path("boxscore")
+        found = {}
+        if directory and os.path.isdir(directory):
+            for name in os.listdir(directory):
+                stem, ext = os.path.splitext(name)
+                season, _, code = stem.rpartition("_")
+                if ext == ".json" and code.isdigit():
+                    found[(season, int(code))] = os.path.join(directory, name)
+        return found
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def host(self):
+        return urlsplit(self.url).netloc
+
+    def settings(self):
+        """Fetcher URL settings for utils.config.configure()."""
+        return {name: self.url + path for name, path in ROUTES.items()}
+
+    def boxscore_body(self, season_code, game_code):
+        if game_code < 1 or game_code > self.games or game_code in self.missing:
+            return b"{}"
+        path = self._boxscores.get((season_code, game_code))
+        if path is None and self._recycled:
+            path = self._boxscores[self._recycled[(game_code - 1) % len(self._recycled)]]
+        if path is not None:
+            with open(path, "rb") as f:
+                return f.read()
+        return json.dumps(synthetic_boxscore(game_code)).encode("utf-8")
+
+    def body_for(self, path, query):
+        """Response body for a request path and parsed query string, or None for 404."""
+        if path == ROUTES["BOXSCORE_URL"]:
+            return self.boxscore_body(query.get("seasoncode", [""])[0], int(query.get("gamecode", ["0"])[0]))
+        if path == ROUTES["CR_URL"]:
+            return self._read_fixture("cr.json") or json.dumps(synthetic_cr()).encode("utf-8")
+        if path == ROUTES["INJURY_URL"]:
+            return self._read_fixture("injuries.json") or json.dumps(synthetic_injuries()).encode("utf-8")
+        if path == ROUTES["DEFENSE_URL"]:
+            pos_id = int(query.get("position_id", ["1"])[0])
+            return (self._read_fixture(f"defense_{pos_id}.json")
+                    or json.dumps(synthetic_defense(pos_id)).encode("utf-8"))
+        return None
+
+    def _delay_and_fail(self):
+        """Sleep for the configured latency; return True if this request should fail."""
+        with self._rng_lock:
+            self.requests += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self._rng.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        return fail
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+            disable_nagle_algorithm = True  # headers and body are separate writes
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if api._delay_and_fail():
+                    status, body = api.error_status, b'{"error": "injected"}'
+                else:
+                    body = api.body_for(parts.path, parse_qs(parts.query))
+                    status = 200 if body is not None else 404
+                    body = body if body is not None else b'{"error": "not found"}'
+                etag = f'"{hashlib.sha1(body).hexdigest()}"' if status == 200 else None
+                if api.etags and etag and self.headers.get("If-None-Match") == etag:
+                    status, body = 304, b""
+                self.send_response(status)
+                if api.etags and etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _write_fixture(path, body):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(body)
+
+
+def record_fixtures(fixture_dir, season_code, game_codes, include_others=True):
+    """
+    Capture live responses into fixture_dir: the boxscores of game_codes for
+    season_code and, with include_others, the CR, injury and defense payloads.
+    Missing games and failed requests are skipped. Returns the number of files written.
+    """
+    from . import data_fetchers
+    from .http_client import http_get
+
+    targets = [
+        (os.path.join(fixture_dir, "boxscore", f"{season_code}_{code}.json"),
+         data_fetchers.boxscore_api_url(code, season_code))
+        for code in game_codes
+    ]
+    if include_others:
+        targets.append((os.path.join(fixture_dir, "cr.json"), data_fetchers.cr_api_url()))
+        targets.append((os.path.join(fixture_dir, "injuries.json"), data_fetchers.injury_api_url()))
+        for pos_id in data_fetchers.DEFENSE_POSITIONS:
+            targets.append((os.path.join(fixture_dir, f"defense_{pos_id}.json"), data_fetchers.defense_api_url(pos_id)))
+
+    written = 0
+    for path, url in targets:
+        try:
+            response = http_get(url, timeout=30)
+            response.raise_for_status()
+            if url.startswith(data_fetchers.api_base_url("BOXSCORE_URL")) and "Stats" not in response.json():
+                print(f"[record] no stats at {url}; skipping")
+                continue
+        except Exception as e:
+            print(f"[record] {url}: {e}")
+            continue
+        _write_fixture(path, response.content)
+        written += 1
+        print(f"[record] {path} ({len(response.content)} bytes)")
+    return written
+
+
+def parse_game_codes(spec):
+    """'1-30,45' -> [1, ..., 30, 45]"""
+    codes = []
+    for part in filter(None, spec.split(",")):
+        lo, _, hi = part.partition("-")
+        codes.extend(range(int(lo), int(hi or lo) + 1))
+    return codes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record or serve API fixtures for offline fetcher runs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Capture live responses into a fixture directory")
+    rec.add_argument("fixture_dir")
+    rec.add_argument("--season", required=True, help="Season code, e.g. E2024")
+    rec.add_argument("--games", default="1-10", help="Game codes to record, e.g. 1-30,45")
+    rec.add_argument("--boxscores-only", action="store_true")
+
+    srv = sub.add_parser("serve", help="Serve fixtures over HTTP")
+    srv.add_argument("fixture_dir", nargs="?")
+    srv.add_argument("--port", type=int, default=8765)
+    srv.add_argument("--games", type=int, default=None, help="Games in the season (default: highest recorded)")
+    srv.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    srv.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random latency, in seconds")
+    srv.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    srv.add_argument("--missing", default="", help="Game codes missing inside the season, e.g. 17,40-42")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        record_fixtures(args.fixture_dir, args.season, parse_game_codes(args.games),
+                        include_others=not args.boxscores_only)
+        return
+
+    api = MockApi(args.fixture_dir, games=args.games, latency=args.latency, jitter=args.jitter,
+                  error_rate=args.error_rate, missing=parse_game_codes(args.missing), port=args.port)
+    print(f"Serving {api.games} games on {api.url}; set:")
+    for name, url in api.settings().items():
+        print(f"  {name}={url}")
+    api.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
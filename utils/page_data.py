@@ -0,0 +1,299 @@
+# utils/page_data.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from .config import get_setting
+from .data_processing import (
+    _load_latest_cr_df,
+    build_pir_windows,
+    load_defense_vs_position_df,
+    merge_player_data,
+    read_injuries_df,
+)
+from .manifest import dataset_name, load_manifest, resolve_key
+from .s3_cache import get_object_cache
+from .s3_utils import candidate_keys
+from .single_flight import SingleFlight, single_flight_snapshot
+from .stats_store import load_player_stats
+from .storage import StorageError, get_storage
+
+# Datasets the page cannot render without; the others degrade to an empty table
+REQUIRED = ("stats", "cr")
+
+
+@dataclass
+class PageData:
+    """Everything main_view renders, loaded as one bundle."""
+    merged: pd.DataFrame
+    injuries: pd.DataFrame
+    defense: pd.DataFrame
+    pir_windows: dict = field(default_factory=dict)  # last N games (None = all) -> PIR stats, see build_pir_windows
+    timings: dict = field(default_factory=dict)  # dataset -> seconds
+    errors: dict = field(default_factory=dict)  # dataset -> error message
+    published_at: str = None  # newest manifest write time among the datasets
+    checked_at: float = field(default_factory=time.time)  # last time this version was confirmed current
+
+
+def _timed(func, *args, **kwargs):
+    """Run func, returning (result, exception, seconds)."""
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs), None, time.perf_counter() - start
+    except Exception as e:
+        return None, e, time.perf_counter() - start
+
+
+def load_page_data(player_stats_file, cr_prefix="player_cr_data", max_lookback_days=14, max_workers=4,
+                   manifest=None):
+    """
+    Load every dataset the main page needs, merge them and precompute the
+    per-player PIR windows.
+
+    The manifest is read once, then stats, CR, injuries and defense vs position
+    are fetched concurrently from that same snapshot, so first paint waits on
+    the slowest dataset rather than the sum of all of them. Per-dataset load
+    times are returned in PageData.timings and printed.
+    Stats and CR failures are raised as before; injuries and defense fall back
+    to empty frames and are reported in PageData.errors.
+    """
+    start = time.perf_counter()
+    manifest_seconds = 0.0
+    if manifest is None:
+        manifest, error, manifest_seconds = _timed(load_manifest)
+        if error is not None:
+            manifest = {"version": 0, "datasets": {}}
+    # Injuries are versioned through the manifest here, so skip load_injuries_df's TTL cache
+    injuries_key = resolve_key(manifest, "injury_report") or "injury_report.csv"
+
+    jobs = {
+        "stats": (load_player_stats, (player_stats_file, manifest), {}),
+        "cr": (_load_latest_cr_df, (), {"prefix": cr_prefix, "max_lookback_days": max_lookback_days,
+                                         "manifest": manifest}),
+        "injuries": (read_injuries_df, (injuries_key,), {}),
+        "defense": (load_defense_vs_position_df, (), {"max_lookback_days": max_lookback_days, "manifest": manifest}),
+    }
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {name: executor.submit(_timed, func, *args, **kwargs) for name, (func, args, kwargs) in jobs.items()}
+        outcomes = {name: future.result() for name, future in futures.items()}
+
+    timings = {"manifest": manifest_seconds}
+    errors = {}
+    results = {}
+    for name, (result, exc, seconds) in outcomes.items():
+        timings[name] = seconds
+        if exc is not None:
+            if name in REQUIRED:
+                raise exc
+            errors[name] = f"{type(exc).__name__}: {exc}"
+            result = pd.DataFrame()
+        results[name] = result
+
+    cr_df, cr_key = results["cr"]
+    print(f"Cr data loaded from file {cr_key}")
+    merge_start = time.perf_counter()
+    merged = merge_player_data(results["stats"], cr_df, results["injuries"])
+    timings["merge"] = time.perf_counter() - merge_start
+    windows_start = time.perf_counter()
+    pir_windows = build_pir_windows(merged)
+    timings["pir_windows"] = time.perf_counter() - windows_start
+    timings["total"] = time.perf_counter() - start
+
+    print("[page-data] " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+    o = get_object_cache().snapshot()
+    print(f"[s3-cache] {o['hits']} hits, {o['disk_hits']} disk hits, {o['misses']} misses, "
+          f"{o['revalidations']} revalidations, {o['coalesced']} coalesced, {o['entries']} entries, "
+          f"{o['bytes'] / 1e6:.1f} MB")
+    for name, message in errors.items():
+        print(f"[page-data] {name} failed to load: {message}")
+    return PageData(merged=merged, injuries=results["injuries"], defense=results["defense"],
+                    pir_windows=pir_windows, timings=timings, errors=errors)
+
+
+# One bundle per (stats file, CR prefix), shared read-only by every session in this process
+_shared = {}
+_shared_lock = threading.Lock()
+_refresher = None
+# A cold load and a background refresh of the same bundle never run side by side
+_page_flights = SingleFlight("page-data")
+
+# How often the background refresher revalidates the shared bundles against the manifest
+REFRESH_SECONDS = float(get_setting("PAGE_DATA_REFRESH_SECONDS", 60))
+
+
+def _version_datasets(player_stats_file, cr_prefix):
+    return [dataset_name(player_stats_file), cr_prefix, "injury_report", "defense_vs_position"]
+
+
+def data_version(manifest, datasets):
+    """Token for the published state of datasets: each one's key and revision from the manifest."""
+    entries = manifest.get("datasets", {})
+    return tuple(
+        (name, entries[name].get("key"), entries[name].get("revision"), entries[name].get("written_at"))
+        if name in entries else (name, None, None, None)
+        for name in datasets
+    )
+
+
+def stats_object_version(player_stats_file):
+    """
+    Version of a stats file the manifest doesn't know (written before it
+    existed): the stored object's key and ETag, or None if there is none.
+    """
+    storage = get_storage()
+    for key in candidate_keys(player_stats_file):
+        try:
+            return key, get_object_cache().current_etag(storage, key)
+        except StorageError:
+            continue
+    return None
+
+
+def published_at(manifest, datasets):
+    """Latest write time among datasets' manifest entries (ISO string), or None."""
+    entries = manifest.get("datasets", {})
+    times = [entries[name]["written_at"] for name in datasets if entries.get(name, {}).get("written_at")]
+    return max(times) if times else None
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
+
+
+def refresh_page_data(player_stats_file, cr_prefix="player_cr_data", max_lookback_days=14):
+    """
+    Revalidate one shared bundle: read the manifest and, if the data version
+    changed, build a new bundle and swap it in atomically. Stats files the
+    manifest doesn't know are versioned by their object's ETag instead.
+    Sessions keep reading the previous bundle until the swap. Concurrent
+    calls for the same bundle share one revalidation. Returns the current
+    PageData.
+    """
+    cache_key = (player_stats_file, cr_prefix)
+    data, _ = _page_flights.do(cache_key, _refresh, cache_key, max_lookback_days)
+    return data
+
+
+def _refresh(cache_key, max_lookback_days):
+    player_stats_file, cr_prefix = cache_key
+    manifest = load_manifest()
+    datasets = _version_datasets(player_stats_file, cr_prefix)
+    version = data_version(manifest, datasets)
+    if datasets[0] not in manifest.get("datasets", {}):
+        version += (stats_object_version(player_stats_file),)
+    with _shared_lock:
+        entry = _shared.get(cache_key)
+    if entry is not None and entry["version"] == version:
+        entry["data"].checked_at = time.time()
+        return entry["data"]
+
+    data = load_page_data(player_stats_file, cr_prefix, max_lookback_days, manifest=manifest)
+    data.published_at = published_at(manifest, datasets)
+    nbytes = {name: frame_bytes(getattr(data, name)) for name in ("merged", "injuries", "defense")}
+    nbytes["pir_windows"] = sum(frame_bytes(stats) for stats in data.pir_windows.values())
+    with _shared_lock:
+        previous = _shared.get(cache_key)
+        _shared[cache_key] = {
+            "version": version,
+            "data": data,
+            "max_lookback_days": max_lookback_days,
+            "bytes": nbytes,
+            "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "hits": previous["hits"] if previous else 0,
+        }
+    print(f"[page-data] {'refreshed' if previous else 'loaded'} {player_stats_file} for all sessions: "
+          f"{sum(nbytes.values()) / 1e6:.1f} MB ({', '.join(f'{k} {v / 1e6:.1f} MB' for k, v in nbytes.items())})")
+    for name, f in single_flight_snapshot().items():
+        print(f"[single-flight] {name}: {f['calls']} calls, {f['loads']} loads, {f['coalesced']} coalesced")
+    return data
+
+
+def _refresh_loop(interval):
+    while True:
+        time.sleep(interval)
+        with _shared_lock:
+            targets = [(key, entry["max_lookback_days"]) for key, entry in _shared.items()]
+        for (stats_file, cr_prefix), lookback in targets:
+            try:
+                refresh_page_data(stats_file, cr_prefix, lookback)
+            except Exception as e:
+                # Keep serving the current bundle; the next tick tries again
+                print(f"[page-data] background refresh of {stats_file} failed: {e}")
+
+
+def start_refresher(interval=None):
+    """Start the background refresh thread once per process (daemon; idempotent)."""
+    global _refresher
+    with _shared_lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=_refresh_loop, args=(interval or REFRESH_SECONDS,),
+                                          name="page-data-refresher", daemon=True)
+            _refresher.start()
+
+
+def get_page_data(player_stats_file, cr_prefix="player_cr_data", max_lookback_days=14):
+    """
+    The shared page bundle, served stale-while-revalidate: after the first load
+    (the only one a session ever waits for) this returns the in-memory bundle
+    immediately, while a background thread revalidates it every
+    PAGE_DATA_REFRESH_SECONDS and swaps in a new version when the fetchers
+    publish one. Sessions arriving during the cold load wait on that one load
+    instead of starting their own. Callers must treat the returned frames as
+    read-only.
+    """
+    cache_key = (player_stats_file, cr_prefix)
+    with _shared_lock:
+        entry = _shared.get(cache_key)
+        if entry is not None:
+            entry["hits"] += 1
+            return entry["data"]
+
+    data = refresh_page_data(player_stats_file, cr_prefix, max_lookback_days)
+    start_refresher()
+    return data
+
+
+def _ago(seconds):
+    if seconds < 90:
+        return f"{int(seconds)} s ago"
+    if seconds < 90 * 60:
+        return f"{int(seconds // 60)} min ago"
+    if seconds < 36 * 3600:
+        return f"{seconds / 3600:.1f} h ago"
+    return f"{seconds / 86400:.1f} days ago"
+
+
+def describe_age(data, now=None):
+    """Human-readable data age for the UI, e.g. 'published 3.2 h ago, checked 40 s ago'."""
+    now = now or time.time()
+    parts = []
+    if data.published_at:
+        published = datetime.fromisoformat(data.published_at).timestamp()
+        parts.append(f"published {_ago(max(0.0, now - published))}")
+    parts.append(f"checked {_ago(max(0.0, now - data.checked_at))}")
+    return ", ".join(parts)
+
+
+def shared_data_report():
+    """
+    Memory, age and hit counts of the shared bundles, for logging or an admin
+    view; "single_flight" holds the coalescing counters of the loads behind them.
+    """
+    with _shared_lock:
+        bundles = {
+            f"{stats_file}|{cr_prefix}": {
+                "bytes": dict(entry["bytes"]),
+                "total_bytes": sum(entry["bytes"].values()),
+                "built_at": entry["built_at"],
+                "published_at": entry["data"].published_at,
+                "checked_at": entry["data"].checked_at,
+                "hits": entry["hits"],
+            }
+            for (stats_file, cr_prefix), entry in _shared.items()
+        }
+    return {"bundles": bundles, "single_flight": single_flight_snapshot()}
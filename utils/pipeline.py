@@ -0,0 +1,102 @@
+# utils/pipeline.py
+
+import contextvars
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Sequence
+
+import pandas as pd
+
+from .http_client import track_bytes
+
+
+@dataclass
+class Stage:
+    """One pipeline step. func takes no arguments; deps name stages that must succeed first."""
+    name: str
+    func: Callable
+    deps: Sequence[str] = field(default_factory=tuple)
+
+
+def _rows_of(result):
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    if isinstance(result, dict) and "rows" in result:
+        return result["rows"]
+    return None
+
+
+def _run_stage(stage):
+    start = time.perf_counter()
+    with track_bytes() as counter:
+        try:
+            result = stage.func()
+            status, error = "ok", None
+        except Exception as e:
+            traceback.print_exc()
+            result, status, error = None, "failed", f"{type(e).__name__}: {e}"
+    return {
+        "stage": stage.name,
+        "status": status,
+        "seconds": round(time.perf_counter() - start, 3),
+        "rows": _rows_of(result),
+        "bytes": counter["bytes"],
+        "error": error,
+    }
+
+
+def run_pipeline(stages, max_workers=4):
+    """
+    Run stages as a DAG: every stage whose dependencies have succeeded starts
+    immediately, independent stages run concurrently, and a failure only skips
+    the stages downstream of it.
+    Returns one report row per stage (status, seconds, rows, bytes, error),
+    in declaration order.
+    """
+    by_name = {s.name: s for s in stages}
+    for s in stages:
+        missing = [d for d in s.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"Stage {s.name} depends on unknown stages: {missing}")
+
+    reports = {}
+    pending = dict(by_name)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, s in list(pending.items()):
+                    dep_status = [reports[d]["status"] if d in reports else None for d in s.deps]
+                    if any(st in ("failed", "skipped") for st in dep_status):
+                        reports[name] = {"stage": name, "status": "skipped", "seconds": 0.0,
+                                         "rows": None, "bytes": 0, "error": "upstream stage failed"}
+                    elif all(st == "ok" for st in dep_status):
+                        # Each stage gets its own context so byte counters don't mix
+                        ctx = contextvars.copy_context()
+                        running[executor.submit(ctx.run, _run_stage, s)] = name
+                    else:
+                        continue
+                    del pending[name]
+                    progressed = True
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Dependency cycle among stages: {sorted(pending)}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                reports[running.pop(future)] = future.result()
+
+    return [reports[s.name] for s in stages]
+
+
+def print_report(report):
+    """Print a run report as an aligned table."""
+    print(f"{'stage':<20} {'status':<8} {'seconds':>8} {'rows':>8} {'bytes':>12}  error")
+    for r in report:
+        rows = "" if r["rows"] is None else r["rows"]
+        print(f"{r['stage']:<20} {r['status']:<8} {r['seconds']:>8.2f} {rows:>8} {r['bytes']:>12}  {r['error'] or ''}")
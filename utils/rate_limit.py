@@ -0,0 +1,152 @@
+# utils/rate_limit.py
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Starting/max request rate (req/s) and max concurrency per host; anything else uses DEFAULT_LIMITS
+HOST_LIMITS = {
+    "live.euroleague.net": {"rate": 8.0, "max_rate": 20.0, "max_concurrency": 8},
+    "www.dunkest.com": {"rate": 2.0, "max_rate": 5.0, "max_concurrency": 3},
+    "www.rotowire.com": {"rate": 1.0, "max_rate": 2.0, "max_concurrency": 2},
+}
+DEFAULT_LIMITS = {"rate": 5.0, "max_rate": 10.0, "max_concurrency": 4}
+
+MIN_RATE = 0.2
+DECREASE_COOLDOWN = 1.0  # seconds; one burst of failures only halves the limits once
+
+
+class HostLimiter:
+    """
+    Token bucket plus AIMD concurrency control for one host.
+
+    Requests take a token (rate limit) and a concurrency slot. Successes raise
+    the concurrency limit additively (+1 per limit's worth of successes) and the
+    rate by 10%; a throttle signal (429, 503, timeout) halves both, at most once
+    per DECREASE_COOLDOWN.
+    """
+
+    def __init__(self, host, rate, max_rate, max_concurrency):
+        self.host = host
+        self.rate = rate
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max(1, max_concurrency // 2))
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self.stats = {"requests": 0, "throttled": 0, "decreases": 0, "wait_seconds": 0.0}
+
+    def _refill(self, now):
+        self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._in_flight < int(self.concurrency) and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self._in_flight += 1
+                    self.stats["requests"] += 1
+                    self.stats["wait_seconds"] += now - start
+                    return
+                # Sleep until a token is due, or until a slot is released
+                self._cond.wait(timeout=max(0.005, (1.0 - self._tokens) / self.rate))
+
+    def release(self, throttled=False):
+        with self._cond:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self.stats["throttled"] += 1
+                if now - self._last_decrease >= DECREASE_COOLDOWN:
+                    self._last_decrease = now
+                    self.stats["decreases"] += 1
+                    self.concurrency = max(1.0, self.concurrency / 2)
+                    self.rate = max(MIN_RATE, self.rate / 2)
+            else:
+                self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+                self.rate = min(self.max_rate, self.rate * 1.1)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold a token and a concurrency slot for one request. The body yields a
+        dict; set outcome["throttled"] = True to report a throttle signal.
+        """
+        self.acquire()
+        outcome = {"throttled": False}
+        try:
+            yield outcome
+        finally:
+            self.release(outcome["throttled"])
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                **self.stats,
+                "rate": round(self.rate, 3),
+                "concurrency_limit": int(self.concurrency),
+                "in_flight": self._in_flight,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+# Fraction of each host's HOST_LIMITS budget this process may use (see set_rate_share)
+_share = 1.0
+
+
+def set_rate_share(share):
+    """
+    Limit this process to `share` of every host's budget: rate, max rate and
+    concurrency are scaled down, e.g. to 1/3 in each of three backfill
+    processes, so parallel processes or Lambda workers together stay within
+    one HOST_LIMITS budget. Limiters are recreated only when the share changes.
+    """
+    global _share
+    share = min(1.0, max(float(share), 0.01))
+    with _limiters_lock:
+        if share != _share:
+            _share = share
+            _limiters.clear()
+
+
+def _limits_for(host):
+    limits = HOST_LIMITS.get(host, DEFAULT_LIMITS)
+    return {
+        "rate": limits["rate"] * _share,
+        "max_rate": limits["max_rate"] * _share,
+        "max_concurrency": max(1, int(limits["max_concurrency"] * _share)),
+    }
+
+
+def get_host_limiter(host):
+    """Return the process-wide limiter for host, created from its share of HOST_LIMITS on first use."""
+    limiter = _limiters.get(host)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(host)
+            if limiter is None:
+                limiter = HostLimiter(host, **_limits_for(host))
+                _limiters[host] = limiter
+    return limiter
+
+
+def rate_limit_snapshot():
+    """Current rate, concurrency limit and throttling counters for every host seen so far."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.host: limiter.snapshot() for limiter in limiters}
+
+
+def reset_rate_limits():
+    """Drop every host's limiter so the next request starts again from HOST_LIMITS (e.g. between benchmark runs)."""
+    with _limiters_lock:
+        _limiters.clear()
@@ -1,6 +1,5 @@
 # utils/recommendations.py
 
-import streamlit as st
 import pandas as pd
 import numpy as np
 
@@ -8,6 +7,7 @@ def recommend_players(df, last_x_games=10, lambda_decay=0.1, w1=1, w2=1, w3=1):
     """
     Recommend top 10 players using a scoring function that takes into account
     average PIR, CR, and standard error of PIR.
+    Returns the top 10 rows; rendering is left to the caller.
     """
     if last_x_games is None or last_x_games <= 0:
         last_x_games = 10
@@ -45,8 +45,7 @@ def recommend_players(df, last_x_games=10, lambda_decay=0.1, w1=1, w2=1, w3=1):
         })
     
     recommendations_df = pd.DataFrame(recommendations).sort_values(by='Score', ascending=False)
-    st.subheader("Top 10 Recommended Players Based on Weighted Formula")
-    st.write(recommendations_df[['PlayerName', 'PIR_Avg', 'StdErr', 'CR', 'position', 'Score']].head(10))
+    return recommendations_df[['PlayerName', 'PIR_Avg', 'StdErr', 'CR', 'position', 'Score']].head(10)
 
 def recommend_players_v2(df, 
                          last_x_games=5, 
@@ -77,13 +76,17 @@ def recommend_players_v2(df,
     weight_consistency : float
         The importance of penalizing players for high volatility 
         (higher means a bigger penalty for large std error).
+
+    Returns:
+    --------
+    pd.DataFrame sorted by Score, or an empty DataFrame if no player qualifies.
     """
 
     # Basic checks
     necessary_cols = {'PlayerName', 'PIR', 'CR', 'GameCode'}
     if not necessary_cols.issubset(df.columns):
-        st.warning(f"DataFrame missing required columns: {necessary_cols - set(df.columns)}")
-        return
+        print(f"DataFrame missing required columns: {necessary_cols - set(df.columns)}")
+        return pd.DataFrame()
 
     # Group by player
     grouped = df.groupby('PlayerName', group_keys=True)
@@ -150,8 +153,8 @@ def recommend_players_v2(df,
         })
 
     if not recommendations:
-        st.warning("No valid players found based on the given data.")
-        return
+        print("No valid players found based on the given data.")
+        return pd.DataFrame()
 
     # Sort by score descending
     recommendations_df = pd.DataFrame(recommendations).sort_values(by='Score', ascending=False)
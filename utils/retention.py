@@ -0,0 +1,197 @@
+# utils/retention.py
+"""
+Retention for dated snapshot datasets (player_cr_data_YYYY-MM-DD,
+defense_vs_position_YYYY-MM-DD, ...).
+
+    python -m utils.retention --days 14
+    python -m utils.retention --days 30 --dry-run
+
+Snapshots older than the retention window are folded into one archive object
+per dataset and month (archive/<dataset>/<dataset>_YYYY-MM.parquet, with a
+SnapshotDate column), then the raw dailies are deleted. The newest snapshot is
+always kept. Finally the manifest entry is pointed at the newest snapshot and
+lists the archives, so readers never walk back over deleted days.
+"""
+
+import argparse
+from datetime import date, timedelta
+
+import pandas as pd
+
+from .config import get_setting
+from .manifest import dataset_name, load_manifest, publish_dataset, snapshot_keys, update_dataset_entry
+from .s3_cache import get_object_cache
+from .s3_utils import candidate_keys, deserialize_df, load_from_s3, save_to_s3
+from .storage import ObjectNotFound, StorageError, get_storage
+
+DATED_DATASETS = ["player_cr_data", "defense_vs_position"]
+ARCHIVE_PREFIX = "archive"
+
+
+def archive_key(dataset, month):
+    """archive/player_cr_data/player_cr_data_2025-10.csv (the extension follows STORAGE_FORMAT on save)"""
+    return f"{ARCHIVE_PREFIX}/{dataset}/{dataset}_{month}.csv"
+
+
+def list_archives(dataset):
+    return sorted(get_storage().list(f"{ARCHIVE_PREFIX}/{dataset}/"))
+
+
+def _load_or_empty(key):
+    df = load_from_s3(key)
+    return df if df is not None else pd.DataFrame()
+
+
+def _load_strict(key):
+    """
+    Like load_from_s3, but only a missing object reads as empty: any other
+    read error raises StorageError instead of looking like an empty snapshot.
+    """
+    storage = get_storage()
+    for candidate in candidate_keys(key):
+        try:
+            return get_object_cache().load(storage, candidate, deserialize_df)
+        except ObjectNotFound:
+            continue
+    return pd.DataFrame()
+
+
+def archive_month(dataset, month, days):
+    """
+    Merge the given {day: key} snapshots of one month into its archive object.
+    Days already in the archive are replaced; a day that can't be read is left
+    out (and must not be deleted). Returns (archive key, days folded in), with
+    a None key if nothing could be written.
+    """
+    key = archive_key(dataset, month)
+    try:
+        existing = _load_strict(key)
+    except StorageError as e:
+        # Rewriting without the existing archive would lose the days already in it
+        print(f"[retention] could not read {key}: {e}")
+        return None, []
+    if not existing.empty and "SnapshotDate" in existing.columns:
+        existing = existing[~existing["SnapshotDate"].isin(list(days))]
+
+    frames = [existing] if not existing.empty else []
+    folded = []
+    for day, snapshot_key in days.items():
+        try:
+            df = _load_strict(snapshot_key)
+        except StorageError as e:
+            print(f"[retention] could not read {snapshot_key}: {e}; keeping it")
+            continue
+        folded.append(day)
+        if not df.empty:
+            frames.append(df.assign(SnapshotDate=day))
+    if not frames:
+        return None, []
+    archive = pd.concat(frames, ignore_index=True).sort_values("SnapshotDate", kind="stable")
+    return save_to_s3(key, archive.reset_index(drop=True)), folded
+
+
+def load_archived_snapshot(dataset, day):
+    """One archived day of a dated dataset, without the SnapshotDate column (empty if unknown)."""
+    day = day.isoformat() if isinstance(day, date) else day
+    archive = _load_or_empty(archive_key(dataset, day[:7]))
+    if archive.empty or "SnapshotDate" not in archive.columns:
+        return pd.DataFrame()
+    return archive[archive["SnapshotDate"] == day].drop(columns="SnapshotDate").reset_index(drop=True)
+
+
+def apply_retention(dataset, retention_days, today=None, dry_run=False):
+    """
+    Archive and delete the snapshots of dataset older than retention_days,
+    then refresh its manifest entry. Returns a summary dict.
+    """
+    today = today or date.today()
+    cutoff = (today - timedelta(days=retention_days)).isoformat()
+    snapshots = snapshot_keys(dataset)
+    newest = max(snapshots) if snapshots else None
+    expired = {day: keys for day, keys in snapshots.items() if day < cutoff and day != newest}
+    summary = {"dataset": dataset, "snapshots": len(snapshots), "expired": len(expired),
+               "archived": [], "deleted": 0, "kept": len(snapshots) - len(expired)}
+    if dry_run or not snapshots:
+        return summary
+
+    if dataset == "player_cr_data" and expired:
+        # The price history is built from the dailies; fold them in before they go
+        from .cr_history import compact_cr_history
+        compact_cr_history()
+
+    by_month = {}
+    for day, keys in expired.items():
+        by_month.setdefault(day[:7], {})[day] = keys[0]
+
+    storage = get_storage()
+    archived_days = []
+    for month, days in sorted(by_month.items()):
+        written, folded = archive_month(dataset, month, days)
+        if written is None:
+            print(f"[retention] could not archive {dataset} {month}; keeping its dailies")
+            continue
+        summary["archived"].append(written)
+        archived_days.extend(folded)
+        # Only days that made it into the archive are deleted
+        for day in folded:
+            for key in expired[day]:
+                try:
+                    storage.delete(key)
+                    summary["deleted"] += 1
+                except StorageError as e:
+                    print(f"[retention] could not delete {key}: {e}")
+
+    summary["kept"] = len(snapshots) - len(archived_days)
+
+    # Retained days stored twice (CSV left over from before the Parquet switch) keep only the Parquet copy
+    for day, keys in snapshots.items():
+        if day in expired or not keys[0].endswith(".parquet"):
+            continue
+        for key in keys[1:]:
+            try:
+                storage.delete(key)
+                summary["deleted"] += 1
+            except StorageError as e:
+                print(f"[retention] could not delete {key}: {e}")
+
+    # Point the manifest at the newest snapshot and record the archives
+    entry = load_manifest().get("datasets", {}).get(dataset, {})
+    newest_key = snapshots[newest][0]
+    fields = {
+        "archives": list_archives(dataset),
+        "retention_days": retention_days,
+        "archived_through": max(archived_days) if archived_days else entry.get("archived_through"),
+    }
+    if entry.get("key") != newest_key:
+        publish_dataset(newest_key, _load_or_empty(newest_key), **fields)
+    elif archived_days:
+        update_dataset_entry(dataset_name(newest_key), **fields)
+    return summary
+
+
+def run_retention(datasets=None, retention_days=None, today=None, dry_run=False):
+    """Apply retention to every dated dataset. SNAPSHOT_RETENTION_DAYS (default 14) sets the window."""
+    if retention_days is None:
+        retention_days = int(get_setting("SNAPSHOT_RETENTION_DAYS", 14))
+    results = []
+    for dataset in datasets or DATED_DATASETS:
+        summary = apply_retention(dataset, retention_days, today=today, dry_run=dry_run)
+        action = "would archive" if dry_run else "archived"
+        print(f"[retention] {dataset}: {summary['snapshots']} snapshots, {action} {summary['expired']} "
+              f"older than {retention_days} days into {len(summary['archived'])} archives, "
+              f"deleted {summary['deleted']} objects, kept {summary['kept']}")
+        results.append(summary)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive and delete dated snapshots past the retention window.")
+    parser.add_argument("--days", type=int, default=None, help="Retention window in days (default 14)")
+    parser.add_argument("--datasets", default=",".join(DATED_DATASETS))
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived")
+    args = parser.parse_args(argv)
+    run_retention(args.datasets.split(","), args.days, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
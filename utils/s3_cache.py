@@ -0,0 +1,174 @@
+# utils/s3_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from .config import get_setting
+from .single_flight import SingleFlight
+
+
+class ObjectCache:
+    """
+    Process-wide read-through cache for stored objects, keyed by (storage, key).
+
+    Each entry keeps the object's raw bytes on local disk (with its ETag) and the
+    parsed DataFrame in memory. Every read revalidates with a conditional GET, so
+    an unchanged object costs one round trip and no download or parse.
+    Total raw bytes are bounded; the least recently used entries are evicted.
+    Concurrent loads of the same key share one revalidation/download.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (storage name, key) -> {"etag", "df", "nbytes"}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "revalidations": 0, "evictions": 0}
+        self._flights = SingleFlight("object-cache")
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, cache_key):
+        digest = hashlib.sha256("\0".join(cache_key).encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, digest)
+        return f"{base}.bin", f"{base}.json"
+
+    def _read_disk(self, cache_key):
+        """Return (body, etag) from the disk copy, or (None, None)."""
+        body_path, meta_path = self._paths(cache_key)
+        try:
+            with open(meta_path) as f:
+                etag = json.load(f)["etag"]
+            with open(body_path, "rb") as f:
+                return f.read(), etag
+        except (OSError, ValueError, KeyError):
+            return None, None
+
+    def _write_disk(self, cache_key, body, etag):
+        body_path, meta_path = self._paths(cache_key)
+        try:
+            for path, data, mode in ((body_path, body, "wb"), (meta_path, json.dumps({"etag": etag}), "w")):
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, mode) as f:
+                    f.write(data)
+                os.replace(tmp, path)
+        except OSError as e:
+            print(f"[cache] could not write disk entry: {e}")
+
+    def _remove_disk(self, cache_key):
+        for path in self._paths(cache_key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _store(self, cache_key, etag, df, nbytes):
+        with self._lock:
+            old = self._entries.pop(cache_key, None)
+            if old is not None:
+                self._bytes -= old["nbytes"]
+            self._entries[cache_key] = {"etag": etag, "df": df, "nbytes": nbytes}
+            self._bytes += nbytes
+            evicted = []
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                victim, entry = self._entries.popitem(last=False)
+                self._bytes -= entry["nbytes"]
+                self.stats["evictions"] += 1
+                evicted.append(victim)
+        for victim in evicted:
+            self._remove_disk(victim)
+
+    def load(self, storage, key, parse):
+        """
+        Return parse(key, body) for the current version of key.
+        Raises whatever storage.get_versioned raises (e.g. ObjectNotFound);
+        a key that no longer exists is dropped from the cache.
+        """
+        try:
+            df, _ = self._flights.do((storage.name, key), self._load, storage, key, parse)
+            return df.copy()
+        except FileNotFoundError:
+            self.invalidate(storage, key)
+            raise
+
+    def _load(self, storage, key, parse):
+        cache_key = (storage.name, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+
+        if entry is not None:
+            body, etag = storage.get_versioned(key, if_none_match=entry["etag"])
+            self._count("revalidations")
+            if body is None:
+                self._count("hits")
+                return entry["df"]
+        else:
+            disk_body, disk_etag = self._read_disk(cache_key)
+            body, etag = storage.get_versioned(key, if_none_match=disk_etag)
+            if disk_etag is not None:
+                self._count("revalidations")
+            if body is None:
+                self._count("disk_hits")
+                df = parse(key, disk_body)
+                self._store(cache_key, etag, df, len(disk_body))
+                return df
+
+        self._count("misses")
+        df = parse(key, body)
+        if etag:
+            self._write_disk(cache_key, body, etag)
+            self._store(cache_key, etag, df, len(body))
+        return df
+
+    def current_etag(self, storage, key):
+        """
+        ETag of key's current version: one conditional request, and no download
+        when the cached copy is current. Raises like storage.get_versioned.
+        """
+        with self._lock:
+            entry = self._entries.get((storage.name, key))
+        _, etag = storage.get_versioned(key, if_none_match=entry["etag"] if entry else None)
+        return etag
+
+    def invalidate(self, storage, key):
+        cache_key = (storage.name, key)
+        with self._lock:
+            entry = self._entries.pop(cache_key, None)
+            if entry is not None:
+                self._bytes -= entry["nbytes"]
+        self._remove_disk(cache_key)
+
+    def snapshot(self):
+        """Counters plus current size, for logging."""
+        with self._lock:
+            counters = {**self.stats, "entries": len(self._entries), "bytes": self._bytes}
+        return {**counters, "coalesced": self._flights.snapshot()["coalesced"]}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_object_cache():
+    """
+    Return the process-wide ObjectCache.
+    S3_CACHE_DIR and S3_CACHE_MAX_BYTES (default 256 MB) configure it.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                cache_dir = get_setting("S3_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "fantassistant-cache")
+                max_bytes = int(get_setting("S3_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+                _cache = ObjectCache(cache_dir, max_bytes)
+    return _cache
@@ -1,14 +1,34 @@
 # utils/s3_utils.py
 
-import streamlit as st
-import boto3
+from io import BytesIO
+
 import pandas as pd
-from botocore.exceptions import NoCredentialsError, ClientError
+from .config import get_setting
+from .s3_cache import get_object_cache
+from .schemas import apply_schema
+from .storage import StorageError, get_storage
+
+def get_bucket_name():
+    """Default bucket, from BUCKET_NAME (env, secrets.toml or Streamlit secrets)."""
+    bucket_name = get_setting("BUCKET_NAME")
+    if not bucket_name:
+        raise StorageError("BUCKET_NAME is not configured")
+    return bucket_name
 
 def get_s3_client():
-    """Initialize and return an S3 client using Streamlit secrets."""
-    AWS_ACCESS_KEY = st.secrets["AWS_ACCESS_KEY"]
-    AWS_SECRET_KEY = st.secrets["AWS_SECRET_KEY"]
+    """
+    Initialize and return an S3 client.
+    Uses AWS_ACCESS_KEY/AWS_SECRET_KEY when configured, otherwise boto3's default
+    credential chain (e.g. the Lambda execution role).
+    Prefer get_storage(), which builds the client once and reuses it.
+    """
+    # Imported here so modules that never touch S3 don't pay for boto3 at import time
+    import boto3
+
+    AWS_ACCESS_KEY = get_setting("AWS_ACCESS_KEY")
+    AWS_SECRET_KEY = get_setting("AWS_SECRET_KEY")
+    if not (AWS_ACCESS_KEY and AWS_SECRET_KEY):
+        return boto3.client('s3')
 
     return boto3.client(
         's3',
@@ -16,34 +36,77 @@ def get_s3_client():
         aws_secret_access_key=AWS_SECRET_KEY
     )
 
-def save_to_s3(filename, df, bucket_name=None):
+def _with_extension(filename, ext):
+    """Swap the extension of a logical filename: player_stats_2025.csv -> player_stats_2025.parquet"""
+    stem, dot, _ = filename.rpartition(".")
+    return f"{stem}.{ext}" if dot else f"{filename}.{ext}"
+
+def serialize_df(filename, df, file_format=None):
     """
-    Saves the given dataframe to S3 as a CSV.
+    Serialize df for storage. Returns (key, body).
+    Parquet objects are zstd-compressed and written with the dataset's explicit schema.
     """
-    if bucket_name is None:
-        bucket_name = st.secrets["BUCKET_NAME"]
+    # STORAGE_FORMAT: "parquet" (default) or "csv"
+    file_format = file_format or get_setting("STORAGE_FORMAT", "parquet")
+    df = apply_schema(filename, df)
+    if file_format == "parquet":
+        buffer = BytesIO()
+        df.to_parquet(buffer, index=False, compression="zstd")
+        return _with_extension(filename, "parquet"), buffer.getvalue()
+    return _with_extension(filename, "csv"), df.to_csv(index=False).encode("utf-8")
 
-    s3_client = get_s3_client()
-    csv_buffer = df.to_csv(index=False)
-    try:
-        s3_client.put_object(Bucket=bucket_name, Key=filename, Body=csv_buffer)
-        print(f"File saved to S3: {filename}")
-    except (NoCredentialsError, ClientError) as e:
-        print(f"Failed to upload {filename} to S3: {e}")
+def deserialize_df(key, body):
+    """Parse stored bytes into a DataFrame, detecting Parquet by its magic number."""
+    if body[:4] == b"PAR1":
+        df = pd.read_parquet(BytesIO(body))
+    else:
+        df = pd.read_csv(BytesIO(body))
+    return apply_schema(key, df)
 
-def load_from_s3(filename, bucket_name=None):
+def candidate_keys(filename):
     """
-    Loads a CSV file from S3 into a pandas DataFrame.
+    Keys to try, in order, when reading a logical filename.
+    During the CSV -> Parquet migration a .csv name also matches its .parquet sibling.
     """
-    if bucket_name is None:
-        bucket_name = st.secrets["BUCKET_NAME"]
+    if filename.endswith(".parquet"):
+        return [filename, _with_extension(filename, "csv")]
+    if filename.endswith(".csv"):
+        return [_with_extension(filename, "parquet"), filename]
+    return [filename]
 
-    s3_client = get_s3_client()
+def save_to_s3(filename, df, bucket_name=None, file_format=None):
+    """
+    Saves the given dataframe to S3 as Parquet (default) or CSV.
+    The extension of filename is replaced to match the format.
+    Returns the key written, or None if the upload failed.
+    """
+    storage = get_storage(bucket_name)
+    key, body = serialize_df(filename, df, file_format)
     try:
-        response = s3_client.get_object(Bucket=bucket_name, Key=filename)
-        df = pd.read_csv(response['Body'])
-        print(f"Loaded file from S3: {filename}")
+        storage.put(key, body)
+        get_object_cache().invalidate(storage, key)
+        print(f"File saved to S3: {key}")
+        return key
+    except StorageError as e:
+        print(f"Failed to upload {key} to S3: {e}")
+        return None
+
+def load_from_s3(filename, bucket_name=None):
+    """
+    Loads a Parquet or CSV file from S3 into a pandas DataFrame.
+    Either format is accepted under either name, so callers keep using the .csv names.
+    Reads go through the process-wide ETag-validated cache, so an unchanged object
+    is neither downloaded nor parsed again.
+    """
+    storage = get_storage(bucket_name)
+    cache = get_object_cache()
+    for key in candidate_keys(filename):
+        try:
+            df = cache.load(storage, key, deserialize_df)
+        except StorageError:
+            continue
+        print(f"Loaded file from S3: {key}")
         return df
-    except ClientError as e:
-        print(f"File not found in S3: {filename}")
-        return pd.DataFrame()
+
+    print(f"File not found in S3: {filename}")
+    return pd.DataFrame()
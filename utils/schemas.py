@@ -0,0 +1,97 @@
+# utils/schemas.py
+
+import pandas as pd
+
+# Bump when a dataset's stored columns or types change; recorded in the manifest
+SCHEMA_VERSION = 2
+
+# Explicit column types per dataset, keyed by object-name prefix.
+# Columns not listed keep whatever type pandas/pyarrow infer.
+SCHEMAS = {
+    "player_stats": {
+        "Season": "str",
+        "GameCode": "int32",
+        "Team": "str",
+        "PlayerID": "str",
+        "PlayerName": "str",
+        "PIR": "float64",
+        "Points": "int16",
+        "Rebounds": "int16",
+        "OffensiveRebounds": "int16",
+        "DefensiveRebounds": "int16",
+        "Assists": "int16",
+        "Steals": "int16",
+        "Blocks": "int16",
+        "BlocksAgainst": "int16",
+        "Turnovers": "int16",
+        "FoulsCommitted": "int16",
+        "FoulsReceived": "int16",
+        "FieldGoalsMade2": "int16",
+        "FieldGoalsAttempted2": "int16",
+        "FieldGoalsMade3": "int16",
+        "FieldGoalsAttempted3": "int16",
+        "FreeThrowsMade": "int16",
+        "FreeThrowsAttempted": "int16",
+        "Seconds": "int32",
+    },
+    "player_cr_data": {
+        "PlayerName": "str",
+        "CR": "float64",
+        "position": "str",
+    },
+    "player_cr_history": {
+        "PlayerName": "str",
+        "Date": "str",
+        "CR": "float64",
+    },
+    "injury_report": {
+        "firstname": "str",
+        "lastname": "str",
+        "player": "str",
+        "team": "str",
+        "position": "str",
+        "injury": "str",
+        "status": "str",
+    },
+    "defense_vs_position": {
+        "Position": "str",
+        "PositionID": "int8",
+    },
+}
+
+
+def dataset_for_key(key):
+    """
+    Return the dataset name a storage key belongs to, or None if unknown.
+    Partition objects (player_stats_2025/game_00001.parquet) match on their directory.
+    """
+    name = key.rsplit("/", 1)[-1]
+    for dataset in SCHEMAS:
+        if name.startswith(dataset) or key.startswith(dataset):
+            return dataset
+    return None
+
+
+def apply_schema(key, df):
+    """
+    Cast the known columns of df to the dataset's declared types.
+    Numeric columns are coerced, so bad values become NaN instead of raising.
+    """
+    dataset = dataset_for_key(key)
+    if dataset is None or df.empty:
+        return df
+
+    df = df.copy()
+    for col, dtype in SCHEMAS[dataset].items():
+        if col not in df.columns:
+            continue
+        if dtype == "str":
+            # Plain Python strings (object dtype), keeping missing values as NaN
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str)).astype(object)
+        elif dtype.startswith("float"):
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+        else:
+            values = pd.to_numeric(df[col], errors="coerce")
+            # Integer columns with gaps fall back to a float column rather than failing
+            df[col] = values.astype(dtype) if values.notna().all() else values
+    return df
@@ -0,0 +1,164 @@
+# utils/sharding.py
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from .data_fetchers import discover_last_game_code, fetch_game_range
+from .manifest import dataset_name
+from .s3_utils import load_from_s3, save_to_s3
+from .stats_store import compact_player_stats, last_stored_game_code, save_checkpoint, write_game_partitions
+from .storage import StorageError, get_storage
+
+
+def plan_shards(start, end, shard_size):
+    """Split [start, end] into consecutive (start, end) ranges of at most shard_size games."""
+    return [(lo, min(lo + shard_size - 1, end)) for lo in range(start, end + 1, shard_size)]
+
+
+def shard_prefix(data_file, run_id):
+    return f"shards/{dataset_name(data_file)}/{run_id}/"
+
+
+def shard_key(data_file, run_id, start, end):
+    return f"{shard_prefix(data_file, run_id)}shard_{start:05d}_{end:05d}.csv"
+
+
+def run_shard(season_code, data_file, run_id, start, end, max_workers=8):
+    """
+    Worker step: fetch games [start, end] and write them as one partial output.
+    Idempotent: a shard whose output already exists is not fetched again, so a
+    failed run can be retried with the same run_id.
+    """
+    key = shard_key(data_file, run_id, start, end)
+    storage = get_storage()
+    for existing in storage.list(key.rsplit(".", 1)[0]):
+        print(f"Shard {start}-{end} already done: {existing}")
+        return {"start": start, "end": end, "key": existing, "rows": None, "skipped": True}
+
+    # Written even when empty, so the reduce step knows the shard ran
+    df = fetch_game_range(season_code, start, end, max_workers=max_workers)
+    written = save_to_s3(key, df)
+    if written is None:
+        raise StorageError(f"Could not write shard output {key}")
+    print(f"Shard {start}-{end}: {len(df)} rows -> {written}")
+    return {"start": start, "end": end, "key": written, "rows": len(df), "skipped": False}
+
+
+def reduce_shards(season_code, data_file, run_id, compact=True):
+    """
+    Reduce step: merge every shard output of run_id into the season's
+    partitions, advance the checkpoint, optionally compact, and delete the
+    partial outputs.
+    """
+    storage = get_storage()
+    keys = storage.list(shard_prefix(data_file, run_id))
+    frames = [df for df in map(load_from_s3, keys) if not df.empty]
+    merged = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    written = write_game_partitions(data_file, merged) if not merged.empty else []
+    if not merged.empty:
+        save_checkpoint(data_file, int(merged["GameCode"].max()))
+    if written and compact:
+        compact_player_stats(data_file)
+
+    for key in keys:
+        try:
+            storage.delete(key)
+        except StorageError as e:
+            print(f"Could not delete shard output {key}: {e}")
+    print(f"Reduced {len(keys)} shards of run {run_id}: {len(merged)} rows, {len(written)} games.")
+    return {"run_id": run_id, "shards": len(keys), "rows": len(merged), "games": len(written)}
+
+
+class LocalInvoker:
+    """Stands in for Lambda: runs the handler in-process, one thread per invocation."""
+
+    # Workers share this process's rate limiters, so they need no budget split
+    in_process = True
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def invoke(self, event):
+        # Round-trip through JSON so events behave exactly like real Lambda payloads
+        return json.loads(json.dumps(self.handler(json.loads(json.dumps(event)), None)))
+
+
+class LambdaInvoker:
+    """Invokes a deployed Lambda function synchronously and returns its JSON result."""
+
+    in_process = False
+
+    def __init__(self, function_name, client=None):
+        self.function_name = function_name
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("lambda")
+        return self._client
+
+    def invoke(self, event):
+        response = self.client.invoke(
+            FunctionName=self.function_name,
+            InvocationType="RequestResponse",
+            Payload=json.dumps(event).encode("utf-8"),
+        )
+        payload = json.loads(response["Payload"].read() or b"null")
+        if response.get("FunctionError"):
+            raise RuntimeError(f"Worker invocation failed: {payload}")
+        return payload
+
+
+def coordinate_sharded_fetch(season_code, data_file, invoker, start=None, end=None,
+                             shard_size=50, max_parallel=10, run_id=None):
+    """
+    Coordinator: split the game-code range into shards, fan them out as
+    independent worker invocations, then run the reduce step once all succeed.
+
+    start defaults to the game after the stored high-water mark and end to the
+    highest game found by discovery. If any shard fails, the reduce step is
+    skipped and the completed shard outputs are kept; re-running with the same
+    run_id only redoes the missing shards.
+    Out-of-process workers each get rate_share = 1/parallel workers, so the
+    whole fan-out stays within one HOST_LIMITS budget.
+    """
+    run_id = run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    if start is None:
+        start = last_stored_game_code(data_file) + 1
+    if end is None:
+        end, _ = discover_last_game_code(season_code, start - 1)
+    if end < start:
+        print(f"Nothing to fetch for {season_code} (start={start}, end={end}).")
+        return {"run_id": run_id, "shards": 0, "failed": [], "reduce": None}
+
+    shards = plan_shards(start, end, shard_size)
+    print(f"Run {run_id}: {len(shards)} shards for games {start}-{end} of {season_code}.")
+
+    parallel = min(max_parallel, len(shards))
+    rate_share = 1.0 if getattr(invoker, "in_process", False) else 1.0 / parallel
+
+    def invoke_worker(shard):
+        event = {"mode": "worker", "season_code": season_code, "data_file": data_file,
+                 "run_id": run_id, "start": shard[0], "end": shard[1], "rate_share": rate_share}
+        try:
+            return shard, invoker.invoke(event), None
+        except Exception as e:
+            return shard, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        outcomes = list(executor.map(invoke_worker, shards))
+
+    failed = [{"start": s[0], "end": s[1], "error": err} for s, _, err in outcomes if err]
+    if failed:
+        print(f"Run {run_id}: {len(failed)} shards failed; skipping reduce. Re-run with run_id={run_id}.")
+        return {"run_id": run_id, "shards": len(shards), "failed": failed, "reduce": None}
+
+    reduced = invoker.invoke({"mode": "reduce", "season_code": season_code,
+                              "data_file": data_file, "run_id": run_id})
+    return {"run_id": run_id, "shards": len(shards), "failed": [], "reduce": reduced}
@@ -0,0 +1,75 @@
+# utils/single_flight.py
+
+import threading
+
+# Every SingleFlight group in the process, for single_flight_snapshot()
+_groups = []
+_groups_lock = threading.Lock()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the
+    load, callers arriving while it is in flight wait for it and receive the
+    same result (or exception) instead of starting their own. Nothing is
+    cached once the load finishes; that is the caller's cache's job.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "loads": 0, "coalesced": 0}
+        with _groups_lock:
+            _groups.append(self)
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Return (func(*args, **kwargs), shared). shared is True when the result
+        came from a load another caller started, so it is the same object they
+        got and must be copied before being modified.
+        """
+        with self._lock:
+            self.stats["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["loads"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, "in_flight": len(self._calls)}
+
+
+def single_flight_snapshot():
+    """Counters of every SingleFlight group, keyed by name."""
+    with _groups_lock:
+        groups = list(_groups)
+    return {group.name: group.snapshot() for group in groups}
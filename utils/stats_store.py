@@ -0,0 +1,287 @@
+# utils/stats_store.py
+
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from .manifest import dataset_name, load_manifest, update_dataset_entry
+from .s3_utils import load_from_s3, save_to_s3
+from .storage import StorageError, get_storage
+
+# Per-game partitions live next to the compacted season file:
+#   player_stats_2025.parquet                <- compacted season
+#   player_stats_2025/game_00123.parquet     <- one object per game, written by the daily run
+_PARTITION_NAME = re.compile(r"game_(\d+)\.(?:parquet|csv)$")
+
+UPSERT_KEYS = ["GameCode", "PlayerID"]
+
+
+def partition_prefix(data_file):
+    return f"{dataset_name(data_file)}/"
+
+
+def partition_key(data_file, game_code):
+    """Logical partition name; save_to_s3 swaps the extension to match the storage format."""
+    return f"{partition_prefix(data_file)}game_{int(game_code):05d}.csv"
+
+
+def list_partitions(data_file, bucket_name=None):
+    """Return {game_code: key} for every partition object of data_file's season."""
+    partitions = {}
+    for key in get_storage(bucket_name).list(partition_prefix(data_file)):
+        match = _PARTITION_NAME.search(key)
+        if match:
+            partitions[int(match.group(1))] = key
+    return partitions
+
+
+def checkpoint_key(data_file):
+    return f"{partition_prefix(data_file)}_checkpoint.json"
+
+
+def load_checkpoint(data_file):
+    """Last game code committed by a fetch run for this season, or 0."""
+    try:
+        body = get_storage().get(checkpoint_key(data_file))
+        return int(json.loads(body)["last_committed_game_code"])
+    except (StorageError, ValueError, KeyError):
+        return 0
+
+
+def save_checkpoint(data_file, game_code):
+    """Record that every game up to game_code has been written for this season."""
+    body = json.dumps({
+        "last_committed_game_code": int(game_code),
+        "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    })
+    try:
+        get_storage().put(checkpoint_key(data_file), body.encode("utf-8"))
+    except StorageError as e:
+        print(f"Failed to save checkpoint for {data_file}: {e}")
+
+
+def _stats_entry(data_file, manifest):
+    return manifest.get("datasets", {}).get(dataset_name(data_file), {})
+
+
+def last_stored_game_code(data_file, manifest=None):
+    """
+    Highest GameCode stored for the season: the later of the manifest's
+    high-water mark and the last fetch checkpoint. Without either, falls back
+    to the compacted file and partition listing.
+    """
+    if manifest is None:
+        manifest = load_manifest()
+    entry = _stats_entry(data_file, manifest)
+    checkpoint = load_checkpoint(data_file)
+    if entry.get("max_game_code") is not None or checkpoint:
+        return max(int(entry.get("max_game_code") or 0), checkpoint)
+
+    df = load_from_s3(data_file)
+    last = int(df["GameCode"].max()) if not df.empty else 0
+    partitions = list_partitions(data_file)
+    return max([last, *partitions])
+
+
+def write_game_partitions(data_file, new_df):
+    """
+    Write one partition object per GameCode in new_df, then record the new
+    high-water mark in the manifest. Only the new games are uploaded.
+    Returns the list of keys written.
+    """
+    if new_df.empty:
+        return []
+
+    written = []
+    for game_code, game_df in new_df.groupby("GameCode", sort=True):
+        game_df = game_df.drop_duplicates(subset=["GameCode", "PlayerID"], keep="last")
+        key = save_to_s3(partition_key(data_file, game_code), game_df)
+        if key is None:
+            # Stop at the first failed upload so the manifest never claims a missing game
+            break
+        written.append((int(game_code), key, len(game_df)))
+
+    if written:
+        # Counters are applied to the entry as read at write time, so concurrent writers of one season add up
+        def add_partitions(entry):
+            return {
+                "rows": int(entry.get("rows", 0)) + sum(n for _, _, n in written),
+                "max_game_code": max(written[-1][0], int(entry.get("max_game_code") or 0)),
+                "partitions": int(entry.get("partitions", 0)) + len(written),
+            }
+        update_dataset_entry(dataset_name(data_file), updater=add_partitions)
+    return [key for _, key, _ in written]
+
+
+def _same_values(a, b):
+    """Elementwise equality that treats two missing values as equal."""
+    a = pd.Series(a).reset_index(drop=True)
+    b = pd.Series(b).reset_index(drop=True)
+    return ((a == b) | (a.isna() & b.isna())).to_numpy(dtype=bool)
+
+
+def upsert_rows(base, updates, keys=UPSERT_KEYS):
+    """
+    Insert or replace rows of base keyed on (GameCode, PlayerID).
+
+    Only the slice of base whose GameCode range overlaps updates is indexed
+    (base is kept sorted by GameCode), so the cost follows the size of the
+    update, not the season. base is returned as-is when nothing changed.
+    Returns (df, counts) with counts = {"inserted", "updated", "unchanged"}.
+    """
+    updates = updates.drop_duplicates(subset=keys, keep="last")
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if updates.empty:
+        return base, counts
+    if base.empty:
+        counts["inserted"] = len(updates)
+        return updates.reset_index(drop=True), counts
+
+    lo, hi = 0, len(base)
+    if base["GameCode"].is_monotonic_increasing:
+        lo = int(base["GameCode"].searchsorted(updates["GameCode"].min(), side="left"))
+        hi = int(base["GameCode"].searchsorted(updates["GameCode"].max(), side="right"))
+    window_index = pd.MultiIndex.from_frame(base.iloc[lo:hi][keys])
+    if not window_index.is_unique:
+        # Legacy data with duplicate keys: dedup it (last row wins, as before), then upsert as usual
+        return upsert_rows(base.drop_duplicates(subset=keys, keep="last").reset_index(drop=True), updates, keys)
+
+    positions = window_index.get_indexer(pd.MultiIndex.from_frame(updates[keys]))
+    matched = positions >= 0
+    inserted = updates[~matched]
+    matched_updates = updates[matched]
+    matched_positions = lo + positions[matched]
+
+    # A matched row is "updated" if any column differs, including a value for a column base doesn't have yet
+    columns = [c for c in matched_updates.columns if c not in keys]
+    unchanged = np.ones(len(matched_updates), dtype=bool)
+    for col in columns:
+        if col in base.columns:
+            unchanged &= _same_values(base[col].to_numpy()[matched_positions], matched_updates[col].to_numpy())
+        else:
+            unchanged &= matched_updates[col].isna().to_numpy(dtype=bool)
+    changed_positions = matched_positions[~unchanged]
+    counts["inserted"] = len(inserted)
+    counts["updated"] = len(changed_positions)
+    counts["unchanged"] = int(unchanged.sum())
+
+    result = base
+    if len(changed_positions):
+        result = base.copy()
+        changed_updates = matched_updates[~unchanged]
+        for col in changed_updates.columns:
+            if col in keys:
+                continue
+            if col not in result.columns:
+                # Numeric stats new to base start as NaN so the column stays numeric
+                result[col] = np.nan if changed_updates[col].dtype.kind in "biuf" else None
+            values = result[col].to_numpy(copy=True)
+            if values.dtype != changed_updates[col].dtype:
+                values = values.astype(object)
+            values[changed_positions] = changed_updates[col].to_numpy()
+            result[col] = pd.Series(values, index=result.index).infer_objects()
+    if len(inserted):
+        result = pd.concat([result, inserted], ignore_index=True)
+        if inserted["GameCode"].min() < base["GameCode"].max():
+            result = result.sort_values("GameCode", kind="stable").reset_index(drop=True)
+    return result, counts
+
+
+def _load_partitions(keys, max_workers=8):
+    if not keys:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as executor:
+        return [df for df in executor.map(load_from_s3, keys) if not df.empty]
+
+
+def load_player_stats(data_file, manifest=None):
+    """
+    Assemble the season's player stats: the compacted file plus any partitions
+    newer than it. When the manifest says nothing is newer, no listing is done.
+    """
+    if manifest is None:
+        manifest = load_manifest()
+    entry = _stats_entry(data_file, manifest)
+    compacted_key = entry.get("key") or data_file
+    compacted = load_from_s3(compacted_key)
+
+    compacted_through = entry.get("compacted_through")
+    if compacted_through is None:
+        compacted_through = int(compacted["GameCode"].max()) if not compacted.empty else 0
+    if entry and int(entry.get("max_game_code") or 0) <= compacted_through:
+        return compacted
+
+    newer = sorted(
+        (code, key) for code, key in list_partitions(data_file).items() if code > compacted_through
+    )
+    frames = _load_partitions([key for _, key in newer])
+    if not frames:
+        return compacted
+    combined, _ = upsert_rows(compacted, pd.concat(frames, ignore_index=True))
+    return combined
+
+
+def compact_player_stats(data_file, min_partitions=1, raise_errors=False):
+    """
+    Fold all partitions into the compacted season file, publish it, then delete
+    the folded partitions. Skipped when fewer than min_partitions are pending.
+    Returns the compacted DataFrame, or None when nothing was done; with
+    raise_errors set (pipeline stages), failing to read or save raises instead.
+    """
+    partitions = list_partitions(data_file)
+    if len(partitions) < min_partitions or not partitions:
+        print(f"Compaction skipped for {data_file}: {len(partitions)} partitions pending.")
+        return None
+
+    manifest = load_manifest()
+    entry = _stats_entry(data_file, manifest)
+    compacted = load_from_s3(entry.get("key") or data_file)
+    if not compacted.empty and not compacted["GameCode"].is_monotonic_increasing:
+        # One-off for files written before compaction kept them sorted
+        compacted = compacted.sort_values("GameCode", kind="stable").reset_index(drop=True)
+    frames = _load_partitions([partitions[c] for c in sorted(partitions)])
+    if not frames:
+        if raise_errors:
+            raise RuntimeError(f"Could not read any of the {len(partitions)} partitions of {data_file}")
+        return None
+    combined, counts = upsert_rows(compacted, pd.concat(frames, ignore_index=True))
+    print(f"Upsert into {data_file}: {counts['inserted']} inserted, "
+          f"{counts['updated']} updated, {counts['unchanged']} unchanged.")
+
+    key = save_to_s3(data_file, combined)
+    if key is None:
+        if raise_errors:
+            raise RuntimeError(f"Failed to save the compacted {data_file}")
+        return None
+    compacted_through = max(int(combined["GameCode"].max()), int(entry.get("compacted_through") or 0))
+
+    def fold_partitions(current):
+        # Partitions another writer added since `entry` was read are still pending: keep them counted
+        added_rows = int(current.get("rows", 0)) - int(entry.get("rows", 0))
+        added_partitions = int(current.get("partitions", 0)) - int(entry.get("partitions", 0))
+        through = compacted_through
+        if added_partitions > 0:
+            # A pending partition at or below our high-water mark would be hidden from readers
+            pending = [code for code in list_partitions(data_file) if code not in partitions]
+            through = min([through, *(code - 1 for code in pending)])
+        return {
+            "rows": int(len(combined)) + max(added_rows, 0),
+            "max_game_code": max(compacted_through, int(current.get("max_game_code") or 0)),
+            "partitions": max(added_partitions, 0),
+            "compacted_through": through,
+        }
+    update_dataset_entry(dataset_name(data_file), updater=fold_partitions, key=key)
+
+    # Readers that already see the new manifest no longer need the partitions
+    storage = get_storage()
+    for partition in partitions.values():
+        try:
+            storage.delete(partition)
+        except StorageError as e:
+            print(f"Could not delete partition {partition}: {e}")
+    print(f"Compacted {len(partitions)} partitions into {key} ({len(combined)} rows).")
+    return combined
@@ -0,0 +1,257 @@
+# utils/storage.py
+
+import os
+import threading
+from contextlib import contextmanager
+
+from .config import get_setting
+
+try:
+    import fcntl
+except ImportError:  # Windows: local conditional writes are then only guarded within the process
+    fcntl = None
+
+
+class StorageError(Exception):
+    """Raised when a storage backend fails to read or write an object."""
+
+
+class ObjectNotFound(StorageError, FileNotFoundError):
+    """Raised when the requested key does not exist."""
+
+
+class PreconditionFailed(StorageError):
+    """Raised when a conditional write loses a race (the object changed underneath it)."""
+
+
+class _NotModified(Exception):
+    """Internal signal for a conditional GET that matched the current ETag."""
+
+
+class S3Storage:
+    """
+    Object storage on an S3 bucket.
+    The boto3 client is created once, on first use, and shared by every thread
+    (boto3 clients are thread-safe; sessions and resources are not).
+    """
+
+    def __init__(self, bucket, client_factory):
+        self.bucket = bucket
+        self.name = f"s3://{bucket}"
+        self._client_factory = client_factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._client_factory()
+        return self._client
+
+    def _call(self, key, method, **kwargs):
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        try:
+            return getattr(self.client, method)(Bucket=self.bucket, **kwargs)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code", "")
+            if code in ("NoSuchKey", "404", "NotFound"):
+                raise ObjectNotFound(key) from e
+            if code in ("304", "NotModified"):
+                raise _NotModified() from e
+            if code in ("412", "PreconditionFailed", "ConditionalRequestConflict"):
+                raise PreconditionFailed(key) from e
+            raise StorageError(f"{method} failed for {key}: {e}") from e
+        except BotoCoreError as e:
+            raise StorageError(f"{method} failed for {key}: {e}") from e
+
+    def get(self, key):
+        """Return the object's bytes. Raises ObjectNotFound if missing."""
+        response = self._call(key, "get_object", Key=key)
+        return response["Body"].read()
+
+    def get_versioned(self, key, if_none_match=None):
+        """
+        Conditional GET. Returns (body, etag); body is None when the object's
+        ETag still equals if_none_match, so nothing is downloaded.
+        """
+        kwargs = {"IfNoneMatch": if_none_match} if if_none_match else {}
+        try:
+            response = self._call(key, "get_object", Key=key, **kwargs)
+        except _NotModified:
+            return None, if_none_match
+        return response["Body"].read(), response.get("ETag")
+
+    def put(self, key, body, if_match=None, if_none_match=None):
+        """
+        Write key. if_match=<etag> only overwrites that exact version and
+        if_none_match="*" only creates a new object; a lost race raises
+        PreconditionFailed.
+        """
+        kwargs = {}
+        if if_match:
+            kwargs["IfMatch"] = if_match
+        if if_none_match:
+            kwargs["IfNoneMatch"] = if_none_match
+        self._call(key, "put_object", Key=key, Body=body, **kwargs)
+
+    def delete(self, key):
+        self._call(key, "delete_object", Key=key)
+
+    def exists(self, key):
+        try:
+            self._call(key, "head_object", Key=key)
+            return True
+        except ObjectNotFound:
+            return False
+
+    def list(self, prefix=""):
+        """Return all keys starting with prefix, sorted."""
+        keys = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            keys.extend(obj["Key"] for obj in page.get("Contents", []))
+        return sorted(keys)
+
+
+class LocalStorage:
+    """
+    Object storage on a local directory, with the same API as S3Storage.
+    Keys map to relative paths under root; writes are atomic (temp file + rename).
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.name = f"file://{self.root}"
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise StorageError(f"Key escapes storage root: {key}")
+        return path
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError as e:
+            raise ObjectNotFound(key) from e
+        except OSError as e:
+            raise StorageError(f"read failed for {key}: {e}") from e
+
+    def _etag(self, path):
+        # Every write replaces the file, so the inode changes even within one mtime tick
+        st = os.stat(path)
+        return f'"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+    def get_versioned(self, key, if_none_match=None):
+        """Conditional read; the ETag is derived from the file's inode, mtime and size."""
+        path = self._path(key)
+        try:
+            etag = self._etag(path)
+            if if_none_match and etag == if_none_match:
+                return None, etag
+            with open(path, "rb") as f:
+                return f.read(), etag
+        except FileNotFoundError as e:
+            raise ObjectNotFound(key) from e
+        except OSError as e:
+            raise StorageError(f"read failed for {key}: {e}") from e
+
+    @contextmanager
+    def _write_lock(self, path):
+        """Exclusive lock shared with other processes writing the same key."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def put(self, key, body, if_match=None, if_none_match=None):
+        """Same contract as S3Storage.put, including conditional writes."""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not (if_match or if_none_match):
+                with open(tmp, "wb") as f:
+                    f.write(body)
+                os.replace(tmp, path)
+                return
+            with self._write_lock(path):
+                current = self._etag(path) if os.path.exists(path) else None
+                if (if_match and current != if_match) or (if_none_match == "*" and current is not None):
+                    raise PreconditionFailed(key)
+                with open(tmp, "wb") as f:
+                    f.write(body)
+                os.replace(tmp, path)
+        except OSError as e:
+            raise StorageError(f"write failed for {key}: {e}") from e
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            raise StorageError(f"delete failed for {key}: {e}") from e
+
+    def exists(self, key):
+        return os.path.isfile(self._path(key))
+
+    def list(self, prefix=""):
+        keys = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith((".tmp", ".lock")):
+                    continue
+                key = os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+
+
+_storages = {}
+_storages_lock = threading.Lock()
+
+
+def get_storage(bucket_name=None):
+    """
+    Return the long-lived storage backend for bucket_name (or the default bucket).
+    STORAGE_BACKEND=local with LOCAL_STORAGE_DIR=<path> serves everything from a
+    local directory instead of S3, e.g. for offline development and benchmarks.
+    """
+    key = bucket_name or "__default__"
+    storage = _storages.get(key)
+    if storage is not None:
+        return storage
+
+    with _storages_lock:
+        storage = _storages.get(key)
+        if storage is None:
+            if get_setting("STORAGE_BACKEND", "s3") == "local":
+                root = get_setting("LOCAL_STORAGE_DIR", "data")
+                storage = LocalStorage(os.path.join(root, bucket_name) if bucket_name else root)
+            else:
+                # Imported lazily so the local backend works without S3 credentials configured
+                from .s3_utils import get_bucket_name, get_s3_client
+                storage = S3Storage(bucket_name or get_bucket_name(), get_s3_client)
+            _storages[key] = storage
+    return storage
+
+
+def set_storage(storage, bucket_name=None):
+    """Install a storage backend explicitly (e.g. a LocalStorage for tests or benchmarks)."""
+    with _storages_lock:
+        _storages[bucket_name or "__default__"] = storage
@@ -8,15 +8,12 @@ import matplotlib.pyplot as plt
 
 # Import utils
 from utils.data_processing import (
-    load_and_merge_data,
     filter_by_cr_and_position,
-    calculate_pir_stats,
+    select_pir_window,
     get_dominant_players,
-    load_injuries_df,
-    load_injuries_df,
     add_injury_badge,
-    load_defense_vs_position_df
 )
+from utils.page_data import describe_age, get_page_data
 from utils.recommendations import (recommend_players, recommend_players_v2)
 
 def main_view():
@@ -73,7 +70,11 @@ def main_view():
     # 2. File Name and Data Loading
     data_file = f'player_stats_{selected_season}.csv'
     cr_file_prefix = 'player_cr_data'
-    df = load_and_merge_data(data_file, cr_file_prefix)
+    # Stats, CR, injuries and defense vs position as one bundle, shared by all sessions
+    # until the fetchers publish a new version (read-only: never modify these frames in place)
+    page_data = get_page_data(data_file, cr_file_prefix)
+    df = page_data.merged
+    st.caption(f"Data {describe_age(page_data)}; refreshed in the background.")
 
     if not df.empty:
         last_stored_game_code = df['GameCode'].max()
@@ -111,6 +112,10 @@ def main_view():
     else:
         last_x_games = int(selected_option.split()[1])
 
+    # Per-player PIR stats for the selected window, looked up from the bundle's precomputed table
+    last_games = last_x_games if last_x_games else df['GameCode'].nunique()
+    pir_stats = select_pir_window(page_data.pir_windows, last_x_games, min_cr, max_cr, selected_position)
+
     show_dominant = st.checkbox("Show Dominant Players Only")
 
     if not is_logged_in:
@@ -137,9 +142,7 @@ def main_view():
     # -- Tab 1: PIR vs. StdDev --
     with tab1:
         st.subheader("PIR vs. Standard Deviation")
-        last_games = last_x_games if last_x_games else df['GameCode'].nunique()
-        last_games_stats = calculate_pir_stats(filtered_df, last_games)
-        last_games_stats = add_injury_badge(last_games_stats)
+        last_games_stats = add_injury_badge(pir_stats)
 
         if not last_games_stats.empty:
             if show_dominant:
@@ -219,9 +222,7 @@ def main_view():
     #         st.info("Not enough data to display PIR vs. CR.")
     # -- Tab 2: PIR vs. CR --
     with tab2:
-        last_games = last_x_games if last_x_games else df['GameCode'].nunique()
-        last_games_stats = calculate_pir_stats(filtered_df, last_games)
-        last_games_stats = add_injury_badge(last_games_stats)
+        last_games_stats = add_injury_badge(pir_stats)
         if is_logged_in:
             st.subheader("PIR vs. CR (Cost)")
             if not last_games_stats.empty:
@@ -286,8 +287,7 @@ def main_view():
 
     # -- Tab 3: PIR Averages DataFrame --
     with tab3:
-        last_games = last_x_games if last_x_games else df['GameCode'].nunique()
-        last_games_stats = calculate_pir_stats(filtered_df, last_games)
+        last_games_stats = pir_stats
         if is_logged_in:
             st.subheader("Player Performance (Averages)")
             if not last_games_stats.empty:
@@ -408,7 +408,7 @@ def main_view():
     with tab5:
         if is_logged_in:
             st.subheader("Injury Report")
-            inj_df = load_injuries_df()  # change key if you use a dated filename
+            inj_df = page_data.injuries
             if inj_df.empty:
                 st.info("No injury data available.")
             else:
@@ -417,7 +417,7 @@ def main_view():
             st.subheader("Injury Report — Locked")
             st.info("🔒 Log in to see the live injury report")
 
-            inj_df = load_injuries_df()
+            inj_df = page_data.injuries
             if inj_df.empty:
                 st.info("No injury data available for preview.")
             else:
@@ -461,7 +461,7 @@ def main_view():
     with tab6:
         if is_logged_in:
             st.subheader("Defense vs Position Stats")
-            def_df = load_defense_vs_position_df()
+            def_df = page_data.defense
             if def_df.empty:
                 st.info("No Defense vs Position data available.")
             else:
@@ -470,7 +470,7 @@ def main_view():
             st.subheader("Defense vs Position Stats — Locked")
             st.info("🔒 Log in to see Defense vs Position stats")
             
-            def_df = load_defense_vs_position_df()
+            def_df = page_data.defense
             if def_df.empty:
                 st.info("No data available for preview.")
             else:
@@ -510,11 +510,14 @@ def main_view():
     st.markdown("### Player Recommendations")
     if st.button("Get Top 10 Recommendations"):
         # You can also call the old version:
-        # recommend_players(filtered_df, last_x_games)
+        # st.write(recommend_players(filtered_df, last_x_games))
         recommendations_df = recommend_players_v2(filtered_df)
+        if recommendations_df.empty:
+            st.warning("No valid players found based on the given data.")
+        else:
             # Print top 10
-        st.subheader("Top 10 Recommended Players (Exponential-Weighted)")
-        st.write(recommendations_df.head(10))
+            st.subheader("Top 10 Recommended Players (Exponential-Weighted)")
+            st.write(recommendations_df.head(10))
 
     ##TEST2###
     if st.button("Advanced Recommendations"):